@@ -0,0 +1,203 @@
+"""
+Action schema registry shared by server and client
+Defines every action the client can execute, its arguments and coordinate
+fields. The server validates model function calls against it before
+returning them, so bad or unknown calls never cost a client round trip.
+
+Coordinates are always sent to the client on the 0-999 normalized grid.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+NORMALIZED_MAX = 999
+
+
+class ActionError(ValueError):
+    """Function call cannot be executed by the client"""
+
+
+@dataclass(frozen=True)
+class Param:
+    name: str
+    type: type
+    required: bool = False
+    default: Any = None
+    choices: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ActionSpec:
+    name: str
+    params: Tuple[Param, ...] = ()
+    # (x, y) argument pairs holding screen coordinates
+    coordinates: Tuple[Tuple[str, str], ...] = ()
+    # Result is known without touching the machine - server answers it itself
+    local: bool = False
+
+
+def _xy(required: bool = True) -> Tuple[Param, Param]:
+    return Param("x", int, required), Param("y", int, required)
+
+
+DIRECTIONS = ("up", "down", "left", "right")
+
+ACTIONS: Dict[str, ActionSpec] = {spec.name: spec for spec in [
+    # Browser
+    ActionSpec("open_web_browser", local=True),
+    ActionSpec("navigate", (Param("url", str, True),)),
+    ActionSpec("search", (Param("query", str),)),
+    ActionSpec("go_back"),
+    ActionSpec("go_forward"),
+    # Mouse
+    ActionSpec("click_at", _xy(), (("x", "y"),)),
+    ActionSpec("hover_at", _xy(), (("x", "y"),)),
+    ActionSpec("drag_and_drop",
+               _xy() + (Param("destination_x", int, True), Param("destination_y", int, True)),
+               (("x", "y"), ("destination_x", "destination_y"))),
+    # Keyboard
+    ActionSpec("type_text_at",
+               _xy(False) + (Param("text", str, True),
+                             Param("press_enter", bool, default=False),
+                             Param("clear_before_typing", bool, default=True)),
+               (("x", "y"),)),
+    ActionSpec("key", (Param("key", str, True),)),
+    ActionSpec("hotkey", (Param("keys", list, True),)),
+    # Scroll
+    ActionSpec("scroll", (Param("direction", str, default="down", choices=DIRECTIONS),
+                          Param("amount", int, default=3))),
+    ActionSpec("scroll_at",
+               _xy() + (Param("direction", str, default="down", choices=DIRECTIONS),
+                        Param("magnitude", int, default=800)),
+               (("x", "y"),)),
+    # Utility
+    ActionSpec("wait_5_seconds"),
+]}
+
+
+# === Remaps: model function name -> (client action, args transform) ===
+
+_KEY_NAMES = {"control": "ctrl", "meta": "win", "command": "command", "escape": "esc",
+              "return": "enter", "arrowleft": "left", "arrowright": "right",
+              "arrowup": "up", "arrowdown": "down", "pagedown": "pagedown", "pageup": "pageup"}
+
+
+def _key_combination(args: Dict[str, Any]) -> Dict[str, Any]:
+    keys = args.get("keys", "")
+    if isinstance(keys, str):
+        keys = keys.split("+")
+    return {"keys": [_KEY_NAMES.get(k.strip().lower(), k.strip().lower()) for k in keys if k.strip()]}
+
+
+def _scroll_document(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"direction": args.get("direction", "down"), "amount": 10}
+
+
+REMAPS: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = {
+    "click": ("click_at", dict),
+    "type": ("type_text_at", dict),
+    "press_key": ("key", dict),
+    "key_combination": ("hotkey", _key_combination),
+    "scroll_document": ("scroll", _scroll_document),
+}
+
+
+# === Validation ===
+
+def _coerce(param: Param, value: Any) -> Any:
+    if param.type is bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes")
+        return bool(value)
+    if param.type is int:
+        return int(round(float(value)))
+    if param.type is str:
+        value = str(value)
+        if param.choices and value.lower() not in param.choices:
+            raise ActionError(f"{param.name} must be one of {', '.join(param.choices)}")
+        return value.lower() if param.choices else value
+    if param.type is list:
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+    return value
+
+
+def normalize_point(x: int, y: int, screen_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    Map a point onto the 0-999 grid
+    Model coordinates are normalized unless x or y is above 1000 - then they
+    are pixels of the screenshot the model saw (needs screen_size).
+    """
+    if (x > 1000 or y > 1000) and screen_size:
+        width, height = screen_size
+        x, y = x * 1000 // width, y * 1000 // height
+    return (min(max(x, 0), NORMALIZED_MAX), min(max(y, 0), NORMALIZED_MAX))
+
+
+def validate_action(action: Dict[str, Any],
+                    screen_size: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """
+    Check a function call against the registry and return the client action
+    {"name": client action, "args": normalized args, "call": model function name}
+    Raises ActionError if the client cannot execute it.
+    """
+    call_name = action.get("call") or action.get("name", "")
+    name = action.get("name", "")
+    args = dict(action.get("args") or {})
+    if name in REMAPS:
+        name, transform = REMAPS[name]
+        args = transform(args)
+
+    spec = ACTIONS.get(name)
+    if spec is None:
+        raise ActionError(f"Unsupported action: {name}")
+
+    normalized = {}
+    for param in spec.params:
+        if args.get(param.name) is None:
+            if param.required:
+                raise ActionError(f"{name}: missing argument {param.name}")
+            if param.default is not None:
+                normalized[param.name] = param.default
+            continue
+        try:
+            normalized[param.name] = _coerce(param, args[param.name])
+        except (TypeError, ValueError) as e:
+            raise ActionError(f"{name}: invalid {param.name}: {e}")
+
+    for x_name, y_name in spec.coordinates:
+        if x_name in normalized and y_name in normalized:
+            normalized[x_name], normalized[y_name] = normalize_point(
+                normalized[x_name], normalized[y_name], screen_size)
+
+    return {"name": name, "args": normalized, "call": call_name}
+
+
+@dataclass
+class ValidatedActions:
+    client: List[Dict[str, Any]] = field(default_factory=list)  # For the client to execute
+    local: List[Dict[str, Any]] = field(default_factory=list)   # Answered by the server
+    rejected: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def validate_actions(actions: List[Dict[str, Any]],
+                     screen_size: Optional[Tuple[int, int]] = None) -> ValidatedActions:
+    result = ValidatedActions()
+    for action in actions:
+        try:
+            validated = validate_action(action, screen_size)
+        except ActionError as e:
+            result.rejected.append({"name": action.get("name", ""),
+                                    "args": action.get("args", {}), "error": str(e)})
+            continue
+        if ACTIONS[validated["name"]].local:
+            result.local.append(validated)
+        else:
+            result.client.append(validated)
+    return result
+
+
+def png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from PNG header, None if not a PNG"""
+    if len(data) < 24 or not data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return None
+    return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
@@ -0,0 +1,126 @@
+"""
+Admission control for Computer Use Server
+Limits running sessions and the rate of model calls so a burst of starts
+queues for a bounded time and then gets 429 + Retry-After instead of
+exhausting memory or the Gemini quota.
+"""
+
+import time
+import math
+import asyncio
+from typing import Dict, Any
+
+
+class AdmissionRejected(Exception):
+    """Server is saturated - client should retry after retry_after seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionController:
+    """
+    Caps the number of running sessions
+    A session holds its slot from start until complete, deleted or idle.
+    Starts over the cap wait in a bounded queue for up to wait_timeout.
+    """
+
+    def __init__(self, max_active: int = 32, max_waiting: int = 64,
+                 wait_timeout: float = 30.0, idle_timeout: float = 300.0):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.idle_timeout = idle_timeout
+        self.active: Dict[str, float] = {}  # session_id -> last activity
+        self.waiting = 0
+        self._released = asyncio.Condition()
+
+    def _reap_idle(self) -> int:
+        """Free slots of sessions the client stopped using"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [sid for sid, last in self.active.items() if last < cutoff]
+        for session_id in idle:
+            del self.active[session_id]
+        return len(idle)
+
+    async def admit(self, session_id: str):
+        """Take a session slot, waiting in queue if all are taken"""
+        if self._reap_idle() and self.waiting:
+            async with self._released:
+                self._released.notify_all()
+        if len(self.active) < self.max_active and not self.waiting:
+            self.active[session_id] = time.monotonic()
+            return
+        if self.waiting >= self.max_waiting:
+            raise AdmissionRejected("Too many sessions waiting", self.wait_timeout)
+
+        self.waiting += 1
+        try:
+            async with self._released:
+                await asyncio.wait_for(
+                    self._released.wait_for(lambda: len(self.active) < self.max_active),
+                    timeout=self.wait_timeout,
+                )
+                self.active[session_id] = time.monotonic()
+        except asyncio.TimeoutError:
+            raise AdmissionRejected("No session slot available", self.wait_timeout)
+        finally:
+            self.waiting -= 1
+
+    def touch(self, session_id: str):
+        """Mark session as active (also re-admits sessions restored after restart)"""
+        self.active[session_id] = time.monotonic()
+
+    async def release(self, session_id: str):
+        if self.active.pop(session_id, None) is not None:
+            async with self._released:
+                self._released.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": len(self.active), "max_active": self.max_active,
+                "waiting": self.waiting, "max_waiting": self.max_waiting}
+
+
+class TokenBucket:
+    """
+    Rate limit for model calls - rate tokens per second, up to burst saved up
+    Callers wait for a token up to max_wait; if more than max_waiting callers
+    are queued, or the wait would be longer, the call is rejected.
+    """
+
+    def __init__(self, rate: float, burst: int, max_wait: float = 30.0, max_waiting: int = 64):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_waiting = max_waiting
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        # Tokens are taken up front - negative balance is the queue ahead of us
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        if wait > 0 and self.waiting >= self.max_waiting:
+            raise AdmissionRejected("Too many model calls waiting", wait)
+        if wait > self.max_wait:
+            raise AdmissionRejected("Model call rate limit", wait)
+
+        self.tokens -= 1
+        if wait > 0:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {"tokens": round(self.tokens, 2), "rate_per_second": self.rate,
+                "burst": self.burst, "waiting": self.waiting}
@@ -0,0 +1,278 @@
+"""
+Model backends for Computer Use Server
+A backend turns the session history into the model's next turn. Session
+history stays in google.genai types (what session_store persists), so every
+backend takes types.Content and returns a types.GenerateContentResponse.
+
+- gemini  - Gemini computer-use model (default)
+- openai  - any OpenAI-compatible chat completions endpoint, e.g. a local
+            inference server; tools are built from the action registry
+- mock    - deterministic scripted replies, no network (tests, load tests)
+
+Each session picks a backend by name when it starts (StartRequest.model).
+SDKs are imported when a backend makes its first call.
+"""
+
+import os
+import json
+import base64
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
+
+from actions import ACTIONS, NORMALIZED_MAX
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = "gemini-2.5-computer-use-preview-10-2025"
+
+
+def load_api_key(path: str = "condig.txt") -> str:
+    """Load API key from condig.txt.
+
+    Supports formats:
+    - AI_API = "key"
+    - GOOGLE_API_KEY="key"
+    - Raw key without =
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+        if '=' in content:
+            # Extract value after = and remove quotes
+            return content.split('=', 1)[1].strip().strip('"').strip("'")
+        return content
+
+
+class ModelBackend(ABC):
+    """Blocking model call - run in a thread by ResilientCaller"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abstractmethod
+    def generate(self, contents: List["types.Content"],
+                 config: "types.GenerateContentConfig") -> "types.GenerateContentResponse":
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_MODEL, api_key: Optional[str] = None):
+        super().__init__(model)
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        """genai client (imports the SDK and reads condig.txt on first use)"""
+        if self._client is None:
+            from google import genai
+            if self.api_key is None:
+                try:
+                    self.api_key = load_api_key()
+                except FileNotFoundError:
+                    raise RuntimeError("condig.txt with the Gemini API key not found")
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def generate(self, contents, config):
+        return self.client.models.generate_content(model=self.model, contents=contents,
+                                                   config=config)
+
+
+# === OpenAI-compatible ===
+
+_JSON_TYPES = {int: "integer", str: "string", bool: "boolean", list: "array"}
+
+
+def registry_tools() -> List[Dict[str, Any]]:
+    """Chat completions tool definitions for every client action"""
+    tools = []
+    for spec in ACTIONS.values():
+        properties = {}
+        for param in spec.params:
+            schema: Dict[str, Any] = {"type": _JSON_TYPES[param.type]}
+            if param.type is list:
+                schema["items"] = {"type": "string"}
+            if param.choices:
+                schema["enum"] = list(param.choices)
+            properties[param.name] = schema
+        description = spec.name.replace("_", " ")
+        if spec.coordinates:
+            description += f" (coordinates on a 0-{NORMALIZED_MAX} grid over the screenshot)"
+        tools.append({"type": "function", "function": {
+            "name": spec.name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties,
+                           "required": [p.name for p in spec.params if p.required]},
+        }})
+    return tools
+
+
+class OpenAICompatibleBackend(ModelBackend):
+    """
+    Chat completions with tool calls (openai SDK)
+    Point base_url at a local server (vLLM, llama.cpp, Ollama ...) to run
+    without a cloud model. The model must accept images.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, temperature: float = 0.0):
+        super().__init__(model)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.temperature = temperature
+        self._client = None
+        self._tools = registry_tools()
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            # Local servers usually ignore the key, but the SDK requires one
+            self._client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key or "local")
+        return self._client
+
+    def to_messages(self, contents) -> List[Dict[str, Any]]:
+        """genai history -> chat messages; function responses become tool messages"""
+        messages = []
+        pending_ids: List[tuple] = []  # (call id, name) awaiting a response
+        for turn, content in enumerate(contents):
+            parts = content.parts or []
+            if content.role == "model":
+                calls = [p.function_call for p in parts if p.function_call]
+                message: Dict[str, Any] = {
+                    "role": "assistant",
+                    "content": "\n".join(p.text for p in parts if p.text) or None,
+                }
+                if calls:
+                    message["tool_calls"] = []
+                    for i, call in enumerate(calls):
+                        call_id = f"call_{turn}_{i}"
+                        pending_ids.append((call_id, call.name))
+                        message["tool_calls"].append({"id": call_id, "type": "function", "function": {
+                            "name": call.name, "arguments": json.dumps(dict(call.args or {}))}})
+                messages.append(message)
+                continue
+
+            user_parts = []
+            for part in parts:
+                if part.function_response:
+                    response = part.function_response
+                    index = next((i for i, (_, name) in enumerate(pending_ids)
+                                  if name == response.name), 0 if pending_ids else None)
+                    if index is None:
+                        user_parts.append({"type": "text", "text": json.dumps(
+                            {"function": response.name, "result": response.response})})
+                        continue
+                    call_id, _ = pending_ids.pop(index)
+                    messages.append({"role": "tool", "tool_call_id": call_id,
+                                     "content": json.dumps(response.response or {})})
+                elif part.inline_data and part.inline_data.data:
+                    data = base64.b64encode(part.inline_data.data).decode("ascii")
+                    user_parts.append({"type": "image_url", "image_url": {
+                        "url": f"data:{part.inline_data.mime_type or 'image/png'};base64,{data}"}})
+                elif part.text:
+                    user_parts.append({"type": "text", "text": part.text})
+            # Every tool call needs an answer before the next user message
+            for call_id, _ in pending_ids:
+                messages.append({"role": "tool", "tool_call_id": call_id,
+                                 "content": json.dumps({"error": "not executed"})})
+            pending_ids.clear()
+            if user_parts:
+                messages.append({"role": "user", "content": user_parts})
+        return messages
+
+    def generate(self, contents, config):
+        from google.genai import types
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.to_messages(contents),
+            tools=self._tools,
+            temperature=self.temperature,
+        )
+        message = completion.choices[0].message
+        parts = []
+        if message.content:
+            parts.append(types.Part(text=message.content))
+        for call in message.tool_calls or []:
+            try:
+                args = json.loads(call.function.arguments or "{}")
+            except ValueError:
+                args = {}  # Rejected by validation with a missing-argument error
+            parts.append(types.Part(function_call={"name": call.function.name, "args": args}))
+        usage = completion.usage
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=usage.prompt_tokens if usage else None),
+        )
+
+
+# === Mock ===
+
+DEFAULT_MOCK_SCRIPT = [
+    {"text": "Opening the test page.", "calls": [
+        {"name": "navigate", "args": {"url": "https://example.com"}}]},
+    {"text": "Clicking the first link.", "calls": [
+        {"name": "click_at", "args": {"x": 500, "y": 400}}]},
+    {"text": "Mock run finished."},
+]
+
+
+class MockBackend(ModelBackend):
+    """
+    Scripted replies - the Nth model turn of a session gets script[N]
+    The turn comes from the history, so replies are the same for every
+    session and survive restarts. Past the end, the last entry repeats.
+    """
+
+    name = "mock"
+
+    def __init__(self, script: Optional[List[Dict[str, Any]]] = None):
+        super().__init__("mock")
+        self.script = script or DEFAULT_MOCK_SCRIPT
+
+    @classmethod
+    def from_file(cls, path: str) -> "MockBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def generate(self, contents, config):
+        from google.genai import types
+        turn = sum(1 for content in contents if content.role == "model")
+        step = self.script[min(turn, len(self.script) - 1)]
+        parts = []
+        if step.get("text"):
+            parts.append(types.Part(text=step["text"]))
+        for call in step.get("calls", []):
+            parts.append(types.Part(function_call={"name": call["name"],
+                                                   "args": call.get("args", {})}))
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts))])
+
+
+# === Registry ===
+
+def backends_from_env() -> Dict[str, ModelBackend]:
+    """Backends this server can route sessions to"""
+    backends: Dict[str, ModelBackend] = {
+        "gemini": GeminiBackend(os.environ.get("LAZYQA_GEMINI_MODEL", GEMINI_MODEL)),
+    }
+    if os.environ.get("LAZYQA_OPENAI_MODEL"):
+        backends["openai"] = OpenAICompatibleBackend(
+            model=os.environ["LAZYQA_OPENAI_MODEL"],
+            base_url=os.environ.get("LAZYQA_OPENAI_BASE_URL"),
+            api_key=os.environ.get("LAZYQA_OPENAI_API_KEY") or os.environ.get("OPENAI_API_KEY"),
+        )
+    mock_script = os.environ.get("LAZYQA_MOCK_SCRIPT")
+    backends["mock"] = MockBackend.from_file(mock_script) if mock_script else MockBackend()
+    return backends
@@ -0,0 +1,135 @@
+"""
+Startup benchmark for the server and the GUI client
+
+Measures, each in a fresh interpreter:
+- import time of main.py and gui_client_new.py
+- time to first request: `uvicorn main:app` start until GET / answers
+- the slowest imports of main.py (python -X importtime)
+
+Worker respawns (cluster.py) and CI runs pay these costs every time.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--port 8765]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def bench_env(data_dir: str) -> dict:
+    """Keep benchmark sessions, blobs and reports out of the working tree"""
+    return dict(
+        os.environ,
+        LAZYQA_BLOB_DIR=os.path.join(data_dir, "blobs"),
+        LAZYQA_SESSION_DIR=os.path.join(data_dir, "sessions_data"),
+        LAZYQA_REPORT_DIR=os.path.join(data_dir, "reports"),
+    )
+
+
+def import_time(module: str, env: dict) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def free_port(preferred: int) -> int:
+    with socket.socket() as s:
+        try:
+            s.bind(("127.0.0.1", preferred))
+        except OSError:
+            s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(port: int, env: dict, timeout: float = 60.0) -> float:
+    """Seconds from spawning the server until GET / returns 200"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        raise TimeoutError(f"Server did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def slowest_imports(module: str, env: dict, top: int = 10) -> list:
+    """(cumulative seconds, module) for the slowest imports, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report(label: str, samples: list):
+    print(f"{label:<34} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   ({len(samples)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = bench_env(data_dir)
+        for module in ("main", "gui_client_new"):
+            try:
+                report(f"import {module}", [import_time(module, env) for _ in range(args.runs)])
+            except subprocess.CalledProcessError as e:
+                print(f"import {module}: failed\n{e.stderr.strip().splitlines()[-1]}")
+
+        port = free_port(args.port)
+        try:
+            report("time to first request (GET /)",
+                   [time_to_first_request(port, env) for _ in range(args.runs)])
+        except (RuntimeError, TimeoutError) as e:
+            print(f"time to first request: {e}")
+
+        try:
+            print("\nslowest imports of main (cumulative):")
+            for seconds, name in slowest_imports("main", env):
+                print(f"  {seconds * 1000:8.1f} ms  {name}")
+        except subprocess.CalledProcessError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Content-addressed blob store for screenshots
+Shared by server (session history, reports) and client (local screenshot log).
+
+Blobs are keyed by sha256 of their bytes, so identical frames are stored once.
+
+Layout:
+    <root>/objects/<id[:2]>/<id>.<ext>   - blob (.png/.jpg/.webp as-is, .z = zlib)
+    <root>/thumbs/<id[:2]>/<id>.jpg      - optional thumbnail tier, created on demand
+
+Image formats are already compressed and stored as-is; anything else is zlib'd.
+Last use is tracked by file mtime and drives the retention policy (prune).
+"""
+
+import os
+import io
+import mmap
+import time
+import zlib
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Optional, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes -> (extension, mime type) for formats stored without recompression
+_IMAGE_FORMATS = [
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"RIFF", "webp", "image/webp"),
+]
+_MIME_BY_EXT = {ext: mime for _, ext, mime in _IMAGE_FORMATS}
+_MIME_BY_EXT["z"] = "application/octet-stream"
+
+THUMBNAIL_SIZE = (320, 200)
+
+# Refresh mtime on read at most this often - avoids a write per read
+_TOUCH_INTERVAL = 3600
+
+
+def blob_id_for(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_blob_id(blob_id: str) -> bool:
+    return len(blob_id) == 64 and all(c in "0123456789abcdef" for c in blob_id)
+
+
+class BlobStore:
+    def __init__(self, root: str = "blobs"):
+        self.root = root
+        self.objects_root = os.path.join(root, "objects")
+        self.thumbs_root = os.path.join(root, "thumbs")
+        os.makedirs(self.objects_root, exist_ok=True)
+
+    def _find(self, blob_id: str) -> Optional[str]:
+        """Path of stored blob, None if missing"""
+        if not _is_blob_id(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        shard = os.path.join(self.objects_root, blob_id[:2])
+        for ext in _MIME_BY_EXT:
+            path = os.path.join(shard, f"{blob_id}.{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            if time.time() - os.stat(path).st_mtime > _TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    # === Write ===
+
+    def put(self, data: bytes) -> str:
+        """Store bytes, return blob id - storing the same bytes again is a no-op"""
+        blob_id = blob_id_for(data)
+        existing = self._find(blob_id)
+        if existing is not None:
+            self._touch(existing)
+            return blob_id
+
+        ext, payload = "z", None
+        for magic, image_ext, _ in _IMAGE_FORMATS:
+            if data.startswith(magic) and (image_ext != "webp" or data[8:12] == b"WEBP"):
+                ext, payload = image_ext, data
+                break
+        if payload is None:
+            payload = zlib.compress(data, 6)
+
+        path = os.path.join(self.objects_root, blob_id[:2], f"{blob_id}.{ext}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return blob_id
+
+    # === Read ===
+
+    def exists(self, blob_id: str) -> bool:
+        return self._find(blob_id) is not None
+
+    def mime_type(self, blob_id: str) -> Optional[str]:
+        path = self._find(blob_id)
+        if path is None:
+            return None
+        return _MIME_BY_EXT[path.rsplit(".", 1)[1]]
+
+    @contextmanager
+    def open(self, blob_id: str) -> Iterator[memoryview]:
+        """Memory-mapped read - no copy into Python memory for stored images"""
+        path = self._find(blob_id)
+        if path is None:
+            raise FileNotFoundError(f"Blob not found: {blob_id}")
+        self._touch(path)
+        with open(path, "rb") as f:
+            if path.endswith(".z"):
+                yield memoryview(zlib.decompress(f.read()))
+                return
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def get(self, blob_id: str) -> bytes:
+        with self.open(blob_id) as view:
+            return bytes(view)
+
+    def thumbnail(self, blob_id: str) -> Optional[bytes]:
+        """JPEG thumbnail of an image blob, created on first request (needs Pillow)"""
+        if not _is_blob_id(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        path = os.path.join(self.thumbs_root, blob_id[:2], f"{blob_id}.jpg")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        with self.open(blob_id) as view:
+            try:
+                image = Image.open(io.BytesIO(view))
+                image.thumbnail(THUMBNAIL_SIZE)
+                buffer = io.BytesIO()
+                image.convert("RGB").save(buffer, format="JPEG", quality=70)
+            except OSError:
+                return None  # Not an image
+        data = buffer.getvalue()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    # === Retention ===
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """(blob id, path, stat) of every stored blob"""
+        if not os.path.isdir(self.objects_root):
+            return
+        for shard in os.scandir(self.objects_root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                yield entry.name.split(".", 1)[0], entry.path, entry.stat()
+
+    def delete(self, blob_id: str) -> bool:
+        path = self._find(blob_id)
+        if path is None:
+            return False
+        os.remove(path)
+        thumb = os.path.join(self.thumbs_root, blob_id[:2], f"{blob_id}.jpg")
+        if os.path.exists(thumb):
+            os.remove(thumb)
+        return True
+
+    def prune(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None,
+              keep: Iterable[str] = ()) -> int:
+        """
+        Apply retention policy, return number of deleted blobs
+        - max_age: delete blobs not used for this many seconds
+        - max_bytes: then delete least recently used blobs until total fits
+        - keep: blob ids that are never deleted
+        """
+        keep = set(keep)
+        now = time.time()
+        blobs = sorted(
+            ((stat.st_mtime, stat.st_size, blob_id) for blob_id, _, stat in self.iter_blobs()),
+            reverse=True,  # Most recently used first
+        )
+        total = 0
+        deleted = 0
+        for mtime, size, blob_id in blobs:
+            expired = max_age is not None and now - mtime > max_age
+            over_budget = max_bytes is not None and total + size > max_bytes
+            if blob_id not in keep and (expired or over_budget):
+                self.delete(blob_id)
+                deleted += 1
+            else:
+                total += size
+        if deleted:
+            logger.info(f"Blob store: pruned {deleted} blobs, {total} bytes kept")
+        return deleted
@@ -0,0 +1,75 @@
+"""
+Per-session budgets for Computer Use Server
+Caps what one session may cost: model turns, cumulative input sent to the
+model (bytes and tokens) and wall time. Checked before every model call,
+so a client that keeps calling /continue gets nothing past the budget.
+
+Server limits come from the environment (0 = unlimited); a request may ask
+for tighter limits but never for more than the server allows.
+"""
+
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+SERVER_LIMITS: Dict[str, int] = {
+    "max_turns": int(os.environ.get("LAZYQA_MAX_TURNS", "50")),
+    "max_input_bytes": int(os.environ.get("LAZYQA_MAX_INPUT_MB", "500")) * 1024 * 1024,
+    "max_input_tokens": int(os.environ.get("LAZYQA_MAX_INPUT_TOKENS", "0")),
+    "max_seconds": int(os.environ.get("LAZYQA_MAX_SESSION_SECONDS", "3600")),
+}
+
+# Limit -> usage it caps (stats counter, except seconds which is measured).
+# Turns are model calls: one client round trip can take several (server-answered turns).
+USAGE = {"max_turns": "model_calls", "max_input_bytes": "input_bytes",
+         "max_input_tokens": "input_tokens", "max_seconds": "seconds"}
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, limit: str, used: float, allowed: int):
+        super().__init__(f"Session budget exceeded: {USAGE[limit]} {used:g} of {allowed}")
+        self.limit = limit
+
+
+def make_budget(requested: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, int]:
+    """Session budget - requested limits, capped by the server's"""
+    budget = dict(SERVER_LIMITS)
+    for name, value in (requested or {}).items():
+        if name not in USAGE or not value or value < 0:
+            continue
+        budget[name] = min(value, budget[name]) if budget[name] else value
+    return budget
+
+
+def usage(session: Dict[str, Any]) -> Dict[str, float]:
+    stats = session.get("stats", {})
+    used = {counter: stats.get(counter, 0) for counter in ("model_calls", "input_bytes", "input_tokens")}
+    elapsed = datetime.utcnow() - datetime.fromisoformat(session["created_at"])
+    used["seconds"] = round(elapsed.total_seconds(), 1)
+    return used
+
+
+def check_budget(session: Dict[str, Any], next_input_bytes: int = 0):
+    """Raise BudgetExceeded if the next model call would go past a limit"""
+    budget = session.get("budget") or SERVER_LIMITS
+    used = usage(session)
+    for name, counter in USAGE.items():
+        limit = budget.get(name)
+        if not limit:
+            continue
+        if counter == "input_bytes":
+            # Known before the call - refuse a call that would cross the limit
+            if used[counter] + next_input_bytes > limit:
+                raise BudgetExceeded(name, used[counter] + next_input_bytes, limit)
+        elif used[counter] >= limit:
+            raise BudgetExceeded(name, used[counter], limit)
+
+
+def budget_report(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Usage against limits, for ActionResponse"""
+    budget = session.get("budget") or SERVER_LIMITS
+    return {
+        "limits": {name: budget.get(name, 0) for name in USAGE},
+        "used": usage(session),
+        "exceeded": session.get("budget_exceeded"),
+    }
@@ -0,0 +1,317 @@
+"""
+Bulk test case import/export
+Streams CSV or JSON-lines files of test cases into and out of the `cases`
+table without holding the file in memory:
+- import parses the request body chunk by chunk, validates each row and
+  writes batches with COPY (asyncpg copy_records_to_table), one
+  transaction per batch; progress is pollable while the upload runs
+- export streams rows from a server-side cursor
+
+Enabled when LAZYQA_DATABASE_URL is set (PostgreSQL, asyncpg).
+"""
+
+import os
+import io
+import csv
+import json
+import uuid
+import codecs
+import logging
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterator
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+
+# Columns written by import and read by export (same fields as test-case-form.js sends)
+CASE_COLUMNS = ["name", "description", "prompt", "is_active", "machine_ip", "metadata"]
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Longest CSV record / JSON line accepted; quoted fields may span up to MAX_RECORD_LINES lines
+MAX_RECORD_CHARS = 64 * 1024
+MAX_RECORD_LINES = 100
+
+# import_id -> progress of the most recent imports
+import_progress: Dict[str, Dict[str, Any]] = {}
+MAX_TRACKED_IMPORTS = 100
+
+# Multi-worker mode - import ids carry the worker id like session ids, so the
+# router sends progress polls to the worker running the import
+WORKER_ID = os.environ.get("LAZYQA_WORKER_ID")
+
+_pool = None
+
+
+async def get_pool():
+    """Connection pool, created on first use"""
+    global _pool
+    if _pool is None:
+        database_url = os.environ.get("LAZYQA_DATABASE_URL")
+        if not database_url:
+            raise HTTPException(status_code=503, detail="LAZYQA_DATABASE_URL is not configured")
+        import asyncpg
+        _pool = await asyncpg.create_pool(database_url, min_size=1, max_size=4)
+    return _pool
+
+
+# === Parsing ===
+
+class RowError(ValueError):
+    pass
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("", "1", "true", "yes", "y"):
+        return True  # Empty means default (active)
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise RowError(f"is_active: not a boolean: {value!r}")
+
+
+def validate_case(row: Dict[str, Any]) -> tuple:
+    """Row dict -> record tuple in CASE_COLUMNS order"""
+    description = str(row.get("description") or "").strip()
+    if not description:
+        raise RowError("description is required")
+
+    metadata = row.get("metadata") or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata) if metadata.strip() else {}
+        except ValueError as e:
+            raise RowError(f"metadata: invalid JSON: {e}")
+    if not isinstance(metadata, dict):
+        raise RowError("metadata must be an object")
+
+    return (
+        str(row.get("name") or description[:100]),
+        description,
+        str(row.get("prompt") or ""),
+        _parse_bool(row.get("is_active", True)),
+        str(row.get("machine_ip") or "127.0.0.1"),
+        json.dumps(metadata, ensure_ascii=False),
+    )
+
+
+class StreamParser:
+    """
+    Incremental CSV / JSON-lines parser - feed() decoded text, get rows back
+    Partial lines (and CSV records with quoted newlines) wait for more text,
+    up to MAX_RECORD_CHARS / MAX_RECORD_LINES. A longer record (e.g. a stray
+    quote) is reported as a RowError and parsing resumes at the next line.
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.buffer = ""
+        self.skipping = False  # Dropping an over-long line up to its newline
+        self.pending: List[str] = []  # Lines of a CSV record spanning several lines
+        self.pending_chars = 0
+        self.in_quotes = False  # Quote parity of the pending record
+        self.header: Optional[List[str]] = None
+        self.line_number = 0
+        self.record_line = 0  # First line of the current record
+
+    def feed(self, text: str, final: bool = False) -> Iterator[tuple]:
+        """Yield (line number, row dict or RowError)"""
+        self.buffer += text
+        lines = self.buffer.split("\n")
+        self.buffer = "" if final else lines.pop()
+        for line in lines:
+            self.line_number += 1
+            if self.skipping:
+                self.skipping = False
+                continue
+            if not self.pending:
+                self.record_line = self.line_number
+            row = self._parse_line(line.rstrip("\r"))
+            if row is not None:
+                yield self.record_line, row
+        if len(self.buffer) > MAX_RECORD_CHARS:
+            # No newline in sight - drop the line instead of buffering the file
+            if not self.skipping:
+                self.skipping = True
+                yield (self.record_line if self.pending else self.line_number + 1,
+                       RowError(f"line longer than {MAX_RECORD_CHARS} characters"))
+                self._reset_record()
+            self.buffer = ""
+        if final and self.pending:
+            yield self.record_line, RowError("unterminated quoted field")
+            self._reset_record()
+
+    def _reset_record(self):
+        self.pending = []
+        self.pending_chars = 0
+        self.in_quotes = False
+
+    def _parse_line(self, line: str):
+        if self.fmt == "jsonl":
+            if not line.strip():
+                return None
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                return RowError(f"invalid JSON: {e}")
+            return row if isinstance(row, dict) else RowError("row must be a JSON object")
+
+        # CSV: a record is complete when its quotes are balanced. Parity is
+        # kept per line, so a long record is never rescanned.
+        if line.count('"') % 2:
+            self.in_quotes = not self.in_quotes
+        self.pending.append(line)
+        self.pending_chars += len(line) + 1
+        if self.in_quotes:
+            if self.pending_chars > MAX_RECORD_CHARS or len(self.pending) > MAX_RECORD_LINES:
+                self._reset_record()
+                return RowError(f"unterminated quoted field (record over {MAX_RECORD_LINES} "
+                                f"lines or {MAX_RECORD_CHARS} characters)")
+            return None
+        record = "\n".join(self.pending)
+        self._reset_record()
+        if not record.strip():
+            return None
+        values = next(csv.reader([record]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            return RowError(f"expected {len(self.header)} columns, got {len(values)}")
+        return dict(zip(self.header, values))
+
+
+# === Import ===
+
+async def _write_batch(pool, project_id: int, batch: List[tuple]):
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.copy_records_to_table(
+                "cases",
+                records=[(project_id,) + record for record in batch],
+                columns=["project_id"] + CASE_COLUMNS,
+            )
+
+
+@router.post("/projects/{project_id}/cases/import")
+async def import_cases(project_id: int, request: Request, format: str = "csv",
+                       import_id: Optional[str] = None):
+    """
+    Import test cases from a CSV (with header) or JSON-lines request body
+    Valid rows are inserted in batches of BATCH_SIZE; invalid rows are
+    skipped and reported with their line number. Poll progress with
+    GET /api/imports/{import_id}.
+    """
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be csv or jsonl")
+    pool = await get_pool()
+
+    if not import_id:
+        import_id = f"{WORKER_ID}-{uuid.uuid4()}" if WORKER_ID else str(uuid.uuid4())
+    while len(import_progress) >= MAX_TRACKED_IMPORTS:
+        del import_progress[next(iter(import_progress))]
+    progress = import_progress[import_id] = {
+        "import_id": import_id, "status": "running", "rows": 0,
+        "inserted": 0, "failed": 0, "errors": [],
+    }
+    parser = StreamParser(format)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    batch: List[tuple] = []
+
+    async def handle(rows):
+        for line_number, row in rows:
+            progress["rows"] += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(validate_case(row))
+            except RowError as e:
+                progress["failed"] += 1
+                if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                    progress["errors"].append({"line": line_number, "error": str(e)})
+                continue
+            if len(batch) >= BATCH_SIZE:
+                await _write_batch(pool, project_id, batch)
+                progress["inserted"] += len(batch)
+                batch.clear()
+
+    try:
+        async for chunk in request.stream():
+            await handle(parser.feed(decoder.decode(chunk)))
+        await handle(parser.feed(decoder.decode(b"", final=True), final=True))
+        if batch:
+            await _write_batch(pool, project_id, batch)
+            progress["inserted"] += len(batch)
+            batch.clear()
+    except UnicodeDecodeError as e:
+        progress["status"] = "failed"
+        raise HTTPException(status_code=400, detail=f"File is not UTF-8: {e}")
+    except Exception as e:
+        progress["status"] = "failed"
+        logger.error(f"Import {import_id} failed after {progress['inserted']} rows: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    progress["status"] = "done"
+    logger.info(f"Import {import_id}: {progress['inserted']} inserted, {progress['failed']} failed")
+    return progress
+
+
+@router.get("/imports/{import_id}")
+async def import_status(import_id: str):
+    """Progress of a running or finished import"""
+    if import_id not in import_progress:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return import_progress[import_id]
+
+
+# === Export ===
+
+async def _export_rows(project_id: int) -> AsyncIterator[Dict[str, Any]]:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            query = (f"SELECT id, {', '.join(CASE_COLUMNS)} FROM cases "
+                     f"WHERE project_id = $1 ORDER BY id")
+            async for record in conn.cursor(query, project_id, prefetch=BATCH_SIZE):
+                row = dict(record)
+                if isinstance(row.get("metadata"), str):
+                    row["metadata"] = json.loads(row["metadata"])
+                yield row
+
+
+async def _export_jsonl(project_id: int) -> AsyncIterator[str]:
+    async for row in _export_rows(project_id):
+        yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+
+async def _export_csv(project_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id"] + CASE_COLUMNS)
+    async for row in _export_rows(project_id):
+        row["metadata"] = json.dumps(row["metadata"], ensure_ascii=False)
+        writer.writerow([row["id"]] + [row[column] for column in CASE_COLUMNS])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/projects/{project_id}/cases/export")
+async def export_cases(project_id: int, format: str = "csv"):
+    """Stream all test cases of a project as CSV or JSON lines (re-importable)"""
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be csv or jsonl")
+    await get_pool()  # Fail with 503 before streaming starts
+    body = _export_csv(project_id) if format == "csv" else _export_jsonl(project_id)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="project-{project_id}-cases.{format}"'
+    })
@@ -0,0 +1,433 @@
+"""
+Multi-worker mode for Computer Use Server
+Runs N uvicorn worker processes behind a small router process.
+
+Sessions live in worker memory, so every request of a session must reach
+the worker that created it. Workers prefix session ids with their worker id
+("w0-<uuid>") and the router reads that prefix - no shared routing table.
+
+Bulk imports are pinned the same way: a worker's import ids carry its
+prefix, so progress polls reach the worker running the import.
+
+Restart (SIGHUP or POST /admin/restart) is rolling: each worker is drained
+(no new sessions, running ones finish), then replaced by a fresh process.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import time
+import signal
+import logging
+import itertools
+import subprocess
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any
+
+import httpx
+from fastapi import FastAPI, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+WORKER_PREFIX = "w"
+EVENT_QUEUE_SIZE = 100
+EVENT_RECONNECT_MIN = 0.5  # Seconds before reconnecting to a worker's event stream,
+EVENT_RECONNECT_MAX = 10.0  # doubled after each failed attempt
+HOP_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "keep-alive"}
+
+
+def worker_for_session(session_id: str) -> Optional[int]:
+    """Get worker index from a session id ("w3-<uuid>" -> 3)"""
+    prefix, sep, _ = session_id.partition("-")
+    if not sep or not prefix.startswith(WORKER_PREFIX):
+        return None
+    try:
+        return int(prefix[len(WORKER_PREFIX):])
+    except ValueError:
+        return None
+
+
+class Worker:
+    """One uvicorn process serving main:app on a local port"""
+
+    def __init__(self, index: int, host: str, port: int):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.draining = False
+
+    @property
+    def worker_id(self) -> str:
+        return f"{WORKER_PREFIX}{self.index}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def spawn(self):
+        env = dict(os.environ, LAZYQA_WORKER_ID=self.worker_id)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app",
+             "--host", self.host, "--port", str(self.port), "--log-level", "info"],
+            env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        logger.info(f"Worker {self.worker_id} started on port {self.port} (pid {self.process.pid})")
+
+    def stop(self, timeout: float = 30.0):
+        if not self.is_alive():
+            return
+        # uvicorn finishes in-flight requests on SIGTERM/CTRL_BREAK
+        if sys.platform == "win32":
+            self.process.terminate()
+        else:
+            self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Worker {self.worker_id} did not stop in {timeout}s, killing")
+            self.process.kill()
+            self.process.wait()
+
+    def health(self) -> Optional[Dict[str, Any]]:
+        try:
+            response = httpx.get(f"{self.url}/", timeout=2)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    def wait_ready(self, timeout: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                return False
+            if self.health() is not None:
+                return True
+            time.sleep(0.2)
+        return False
+
+
+class Supervisor:
+    """Starts, monitors and rolling-restarts worker processes"""
+
+    def __init__(self, num_workers: int, host: str = "127.0.0.1", base_port: int = 8081,
+                 drain_timeout: float = 600.0):
+        self.workers: List[Worker] = [
+            Worker(i, host, base_port + i) for i in range(num_workers)
+        ]
+        self.drain_timeout = drain_timeout
+        self._lock = threading.Lock()
+        self._round_robin = itertools.cycle(range(num_workers))
+        self._stopping = threading.Event()
+        self._restart_lock = threading.Lock()
+
+    def start(self):
+        for worker in self.workers:
+            worker.spawn()
+        for worker in self.workers:
+            if not worker.wait_ready():
+                logger.error(f"Worker {worker.worker_id} failed to start")
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def _monitor(self):
+        """Respawn workers that crashed (not the ones being restarted)"""
+        while not self._stopping.wait(2.0):
+            for worker in self.workers:
+                if not worker.draining and not worker.is_alive():
+                    logger.warning(f"Worker {worker.worker_id} died, respawning")
+                    worker.spawn()
+
+    def pick_worker(self) -> Optional[Worker]:
+        """Next worker for a new session - skips draining and dead workers"""
+        with self._lock:
+            for _ in range(len(self.workers)):
+                worker = self.workers[next(self._round_robin)]
+                if not worker.draining and worker.is_alive():
+                    return worker
+        return None
+
+    def get_worker(self, index: int) -> Optional[Worker]:
+        if 0 <= index < len(self.workers):
+            return self.workers[index]
+        return None
+
+    def drain(self, worker: Worker):
+        """Stop routing new sessions to worker and wait for running ones"""
+        worker.draining = True
+        try:
+            httpx.post(f"{worker.url}/api/v1/admin/drain", timeout=5)
+        except httpx.HTTPError as e:
+            logger.warning(f"Worker {worker.worker_id}: drain request failed: {e}")
+        deadline = time.monotonic() + self.drain_timeout
+        while time.monotonic() < deadline and worker.is_alive():
+            health = worker.health()
+            if health is None or health.get("active_sessions", 0) == 0:
+                return
+            logger.info(f"Worker {worker.worker_id}: waiting for "
+                        f"{health['active_sessions']} active sessions")
+            time.sleep(2.0)
+        logger.warning(f"Worker {worker.worker_id}: drain timeout, restarting anyway")
+
+    def rolling_restart(self):
+        """Drain and replace workers one at a time so capacity never drops to zero"""
+        if not self._restart_lock.acquire(blocking=False):
+            logger.info("Restart already in progress")
+            return
+        try:
+            for worker in self.workers:
+                logger.info(f"Restarting worker {worker.worker_id}")
+                self.drain(worker)
+                worker.stop()
+                worker.spawn()
+                worker.wait_ready()
+                worker.draining = False
+            logger.info("Rolling restart complete")
+        finally:
+            self._restart_lock.release()
+
+    def shutdown(self):
+        """
+        Stop all workers in parallel - uvicorn finishes in-flight requests on
+        SIGTERM and sessions are checkpointed, so no drain: with the router
+        already down, clients could not finish their sessions anyway
+        """
+        self._stopping.set()
+        threads = [threading.Thread(target=w.stop) for w in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def create_router(supervisor: Supervisor) -> FastAPI:
+    """Router app - forwards each request to the worker owning its session"""
+    client = httpx.AsyncClient(timeout=None)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    router = FastAPI(title="Computer Use Router", version="1.0.0", lifespan=lifespan)
+
+    async def send(worker: Worker, request: Request, body) -> httpx.Response:
+        """Send request to worker; the response body is read later, by relay()"""
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        upstream = client.build_request(
+            request.method,
+            f"{worker.url}{request.url.path}",
+            params=request.query_params,
+            content=body,
+            headers=headers,
+        )
+        return await client.send(upstream, stream=True)
+
+    def relay(upstream: httpx.Response) -> Response:
+        """Stream the worker's response through - exports are never held in memory"""
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS}
+        return StreamingResponse(upstream.aiter_raw(), status_code=upstream.status_code,
+                                 headers=headers, background=BackgroundTask(upstream.aclose))
+
+    async def forward(worker: Worker, request: Request, body) -> Response:
+        return relay(await send(worker, request, body))
+
+    async def forward_to(worker: Worker, request: Request, body) -> Response:
+        """forward() for a fixed worker - unreachable (crashed, restarting) is a 503"""
+        try:
+            return await forward(worker, request, body)
+        except httpx.TransportError as e:
+            logger.warning(f"Worker {worker.worker_id} unreachable: {e}")
+            raise HTTPException(status_code=503, detail="Worker unavailable",
+                                headers={"Retry-After": "1"})
+
+    def session_worker(session_id: str) -> Worker:
+        index = worker_for_session(session_id)
+        worker = supervisor.get_worker(index) if index is not None else None
+        if worker is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return worker
+
+    @router.get("/")
+    async def health_check():
+        return {
+            "service": "Computer Use Router",
+            "status": "running",
+            "workers": [
+                {"worker_id": w.worker_id, "port": w.port,
+                 "alive": w.is_alive(), "draining": w.draining}
+                for w in supervisor.workers
+            ],
+        }
+
+    @router.post("/admin/restart")
+    async def restart():
+        threading.Thread(target=supervisor.rolling_restart, daemon=True).start()
+        return {"message": "Rolling restart started"}
+
+    @router.post("/api/v1/start")
+    async def start_session(request: Request):
+        body = await request.body()
+        # A worker may start draining between pick and request - try the next one
+        for _ in range(len(supervisor.workers)):
+            worker = supervisor.pick_worker()
+            if worker is None:
+                break
+            try:
+                upstream = await send(worker, request, body)
+            except httpx.TransportError as e:
+                logger.warning(f"Worker {worker.worker_id} unreachable: {e}")
+                continue
+            if upstream.status_code != 503:
+                return relay(upstream)
+            await upstream.aclose()
+        raise HTTPException(status_code=503, detail="No worker available",
+                            headers={"Retry-After": "1"})
+
+    @router.post("/api/v1/continue")
+    async def continue_session(request: Request):
+        body = await request.body()
+        try:
+            session_id = json.loads(body).get("session_id", "")
+        except (ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail="Invalid request body")
+        return await forward_to(session_worker(session_id), request, body)
+
+    @router.api_route("/api/v1/session/{session_id}", methods=["GET", "DELETE"])
+    async def session_route(session_id: str, request: Request):
+        return await forward_to(session_worker(session_id), request, await request.body())
+
+    @router.get("/api/v1/sessions")
+    async def list_sessions():
+        merged = []
+        for worker in supervisor.workers:
+            if not worker.is_alive():
+                continue
+            try:
+                response = await client.get(f"{worker.url}/api/v1/sessions")
+                merged.extend(response.json().get("sessions", []))
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Worker {worker.worker_id}: list sessions failed: {e}")
+        return {"total_sessions": len(merged), "sessions": merged}
+
+    @router.get("/api/v1/events")
+    async def events(session_id: Optional[str] = None):
+        """Live events - streamed from the session's worker, or merged from all workers"""
+        # Dead workers too - they are respawned, and pump() reconnects
+        workers = [session_worker(session_id)] if session_id else list(supervisor.workers)
+        # Bounded like the workers' own buffers - a slow viewer drops, never blocks
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+        async def pump(worker: Worker):
+            """Relay one worker's events; reconnect with backoff when it restarts or dies"""
+            params = {"session_id": session_id} if session_id else {}
+            backoff = EVENT_RECONNECT_MIN
+            while True:
+                try:
+                    async with client.stream("GET", f"{worker.url}/api/v1/events",
+                                             params=params) as upstream:
+                        backoff = EVENT_RECONNECT_MIN
+                        block = ""
+                        async for line in upstream.aiter_lines():
+                            block += line + "\n"
+                            if line:
+                                continue
+                            if not block.startswith((":", "retry:")):
+                                try:
+                                    queue.put_nowait(block)
+                                except asyncio.QueueFull:
+                                    pass
+                            block = ""
+                    logger.info(f"Worker {worker.worker_id}: event stream ended, reconnecting")
+                except httpx.HTTPError as e:
+                    logger.debug(f"Worker {worker.worker_id}: event stream unavailable: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, EVENT_RECONNECT_MAX)
+
+        async def merged():
+            tasks = [asyncio.ensure_future(pump(w)) for w in workers]
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        yield await asyncio.wait_for(queue.get(), 15.0)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(merged(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @router.post("/api/projects/{project_id}/cases/import")
+    async def import_cases(project_id: int, request: Request):
+        """Bulk import - the upload is streamed through to one worker, never buffered here"""
+        worker = supervisor.pick_worker()
+        if worker is None:
+            raise HTTPException(status_code=503, detail="No worker available",
+                                headers={"Retry-After": "1"})
+        return await forward_to(worker, request, request.stream())
+
+    @router.get("/api/imports/{import_id}")
+    async def import_status(import_id: str, request: Request):
+        """Import progress lives on the worker running the import"""
+        index = worker_for_session(import_id)
+        worker = supervisor.get_worker(index) if index is not None else None
+        if worker is not None:
+            return await forward_to(worker, request, b"")
+        # import_id chosen by the client - ask every worker
+        for worker in supervisor.workers:
+            if not worker.is_alive():
+                continue
+            try:
+                response = await client.get(f"{worker.url}/api/imports/{import_id}")
+            except httpx.TransportError:
+                continue
+            if response.status_code != 404:
+                return Response(content=response.content, status_code=response.status_code,
+                                media_type="application/json")
+        raise HTTPException(status_code=404, detail="Import not found")
+
+    @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def any_worker(path: str, request: Request):
+        """Everything not tied to a session (blobs, reports, metrics) - any worker"""
+        if path.startswith("api/v1/admin/"):
+            # Worker admin (drain) belongs to the supervisor - see /admin/restart
+            raise HTTPException(status_code=404, detail="Not found")
+        worker = supervisor.pick_worker()
+        if worker is None:
+            raise HTTPException(status_code=503, detail="No worker available",
+                                headers={"Retry-After": "1"})
+        return await forward_to(worker, request, await request.body())
+
+    return router
+
+
+def run_cluster(num_workers: int, host: str = "127.0.0.1", port: int = 8080,
+                drain_timeout: float = 600.0):
+    """Run router on host:port and workers on the following local ports"""
+    import uvicorn
+
+    supervisor = Supervisor(num_workers, base_port=port + 1, drain_timeout=drain_timeout)
+    supervisor.start()
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: threading.Thread(
+            target=supervisor.rolling_restart, daemon=True).start())
+
+    try:
+        uvicorn.run(create_router(supervisor), host=host, port=port, log_level="info")
+    finally:
+        logger.info("Router stopped, stopping workers...")
+        supervisor.shutdown()
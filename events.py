@@ -0,0 +1,108 @@
+"""
+Live run events for Computer Use Server
+The agent loop publishes one event per iteration (reasoning, actions,
+screenshot thumbnail, status); viewers subscribe over Server-Sent Events.
+
+publish() never waits: every subscriber has its own bounded buffer and a
+slow viewer loses its oldest events (and is told how many) instead of
+slowing down the session that produced them.
+"""
+
+import json
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One viewer - bounded buffer of events, oldest dropped when full"""
+
+    def __init__(self, session_id: Optional[str], max_buffer: int):
+        self.session_id = session_id
+        self.buffer: deque = deque(maxlen=max_buffer)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, a "dropped" notice if events were lost, None on timeout"""
+        if not self.buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "dropped", "count": dropped}
+        return self.buffer.popleft()
+
+
+class EventBus:
+    def __init__(self, max_buffer: int = 100, keep_latest: int = 256):
+        self.max_buffer = max_buffer
+        self.keep_latest = keep_latest
+        self.subscribers: Set[Subscription] = set()
+        # session_id -> last event, so new viewers see current state right away
+        self.latest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.seq = 0
+        self.published = 0
+
+    def publish(self, event_type: str, session_id: str, **data):
+        """Fan event out to subscribers - O(subscribers), never blocks"""
+        self.seq += 1
+        self.published += 1
+        event = {"type": event_type, "id": self.seq, "session_id": session_id,
+                 "time": datetime.utcnow().isoformat(), **data}
+        self.latest[session_id] = event
+        self.latest.move_to_end(session_id)
+        while len(self.latest) > self.keep_latest:
+            self.latest.popitem(last=False)
+        for subscription in self.subscribers:
+            if subscription.session_id in (None, session_id):
+                subscription.push(event)
+
+    def subscribe(self, session_id: Optional[str] = None) -> Subscription:
+        """Subscribe to one session, or to all sessions if session_id is None"""
+        subscription = Subscription(session_id, self.max_buffer)
+        if session_id is None:
+            for event in self.latest.values():
+                subscription.push(event)
+        elif session_id in self.latest:
+            subscription.push(self.latest[session_id])
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    async def stream(self, session_id: Optional[str] = None, keepalive: float = 15.0):
+        """Server-Sent Events stream for one subscriber (for StreamingResponse)"""
+        subscription = self.subscribe(session_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.get(keepalive)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_id = f"id: {event['id']}\n" if "id" in event else ""
+                yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "buffered": sum(len(s.buffer) for s in self.subscribers),
+        }
@@ -0,0 +1,380 @@
+"""
+Execution backends for the GUI client
+An executor is the screen and input devices one agent works on:
+screenshots, mouse, keyboard and opening URLs.
+
+- LocalDesktopExecutor - the physical screen (pyautogui, pynput, keyboard,
+  PIL ImageGrab); one agent per machine
+- XvfbExecutor - a private Xvfb virtual display per agent (Linux). Capture
+  with mss (python-xlib fallback), mouse via XTest, keyboard via xdotool,
+  so many agents can run side by side on one machine without a GPU
+
+Libraries are imported on first use, so only the chosen executor's
+dependencies need to be installed.
+"""
+
+import os
+import time
+import select
+import logging
+import shutil
+import tempfile
+import subprocess
+import webbrowser
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple, List
+
+logger = logging.getLogger(__name__)
+
+
+class Executor(ABC):
+    """Screen and input devices of one agent"""
+
+    @abstractmethod
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def screenshot(self):
+        """Full screen as a PIL image"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def mouse_position(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def move_mouse(self, x: int, y: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def mouse_down(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def mouse_up(self):
+        raise NotImplementedError
+
+    def click(self):
+        self.mouse_down()
+        self.mouse_up()
+
+    @abstractmethod
+    def scroll(self, direction: str, clicks: int):
+        """Scroll by clicks in direction (up/down/left/right)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def press(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def hotkey(self, *keys: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def type_text(self, text: str):
+        """Type any Unicode text at the focused element"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_url(self, url: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalDesktopExecutor(Executor):
+    """The machine's own screen and input devices"""
+
+    def __init__(self):
+        self._size: Optional[Tuple[int, int]] = None
+        self._mouse = None
+
+    @property
+    def mouse(self):
+        if self._mouse is None:
+            from pynput.mouse import Controller as MouseController
+            self._mouse = MouseController()
+        return self._mouse
+
+    def screen_size(self):
+        if self._size is None:  # Queried once
+            import pyautogui
+            width, height = pyautogui.size()
+            self._size = (width, height)
+        return self._size
+
+    def screenshot(self):
+        from PIL import ImageGrab
+        return ImageGrab.grab()
+
+    def mouse_position(self):
+        return self.mouse.position
+
+    def move_mouse(self, x, y):
+        self.mouse.position = (x, y)
+
+    def mouse_down(self):
+        from pynput.mouse import Button
+        self.mouse.press(Button.left)
+
+    def mouse_up(self):
+        from pynput.mouse import Button
+        self.mouse.release(Button.left)
+
+    def click(self):
+        from pynput.mouse import Button
+        self.mouse.click(Button.left, 1)
+
+    def scroll(self, direction, clicks):
+        import pyautogui
+        if direction in ("up", "down"):
+            pyautogui.scroll(clicks if direction == "up" else -clicks)
+        else:
+            pyautogui.hscroll(clicks if direction == "right" else -clicks)
+
+    def press(self, key):
+        import pyautogui
+        pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        import pyautogui
+        pyautogui.hotkey(*keys)
+
+    def type_text(self, text):
+        # keyboard library types Unicode (all languages), pyautogui only ASCII
+        import keyboard
+        keyboard.write(text, delay=0.02)
+
+    def open_url(self, url):
+        webbrowser.open(url)
+
+
+# === Xvfb ===
+
+# pyautogui key names -> X keysym names (xdotool)
+_X_KEYS = {
+    "enter": "Return", "return": "Return", "esc": "Escape", "escape": "Escape",
+    "tab": "Tab", "backspace": "BackSpace", "delete": "Delete", "space": "space",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right",
+    "home": "Home", "end": "End", "pageup": "Page_Up", "pagedown": "Page_Down",
+    "ctrl": "ctrl", "control": "ctrl", "alt": "alt", "shift": "shift",
+    "win": "super", "command": "super", "meta": "super",
+}
+
+# X pointer buttons used for scrolling
+_SCROLL_BUTTONS = {"up": 4, "down": 5, "left": 6, "right": 7}
+
+BROWSERS = ("chromium", "chromium-browser", "google-chrome", "firefox")
+
+
+class XvfbExecutor(Executor):
+    """
+    Private virtual display (Xvfb :N) with its own capture and input
+    The display is started on first use (a free one unless display is
+    given) together with a browser on about:blank - the server answers
+    open_web_browser itself, so a browser must already be on screen - and
+    both are stopped by close(). Each executor gets its own browser
+    profile, so agents never share tabs.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (1280, 800), display: Optional[int] = None,
+                 browser: Optional[str] = None, start_timeout: float = 10.0):
+        self.size = size
+        self.display_number = display
+        self.browser = browser or os.environ.get("LAZYQA_BROWSER") or next(
+            (name for name in BROWSERS if shutil.which(name)), None)
+        self.start_timeout = start_timeout
+        self.xvfb: Optional[subprocess.Popen] = None
+        self.browser_process: Optional[subprocess.Popen] = None
+        self.profile_dir: Optional[str] = None
+        self._display = None  # Xlib connection
+        self._capture = None  # mss instance
+
+    @property
+    def display_name(self) -> str:
+        return f":{self.display_number}"
+
+    @property
+    def env(self) -> dict:
+        """Environment for programs that should run on this display"""
+        return dict(os.environ, DISPLAY=self.display_name)
+
+    def start(self):
+        if self.xvfb is not None and self.xvfb.poll() is None:
+            return
+        self._start_xvfb()
+        if self.browser is not None:
+            self.open_url("about:blank")
+            self._wait_for_window()
+        else:
+            logger.warning(f"No browser found for {self.display_name} - set LAZYQA_BROWSER")
+
+    def _start_xvfb(self):
+        width, height = self.size
+        command = ["Xvfb", "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"]
+        if self.display_number is not None:
+            self.xvfb = subprocess.Popen([*command, self.display_name],
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._wait_for_socket()
+            return
+        # -displayfd: Xvfb picks a free display itself and reports it - no race
+        # between clients starting at the same time
+        read_fd, write_fd = os.pipe()
+        try:
+            self.xvfb = subprocess.Popen([*command, "-displayfd", str(write_fd)],
+                                         pass_fds=(write_fd,), stdout=subprocess.DEVNULL,
+                                         stderr=subprocess.DEVNULL)
+            os.close(write_fd)
+            write_fd = None
+            ready, _, _ = select.select([read_fd], [], [], self.start_timeout)
+            number = os.read(read_fd, 16).decode().strip() if ready else ""
+        finally:
+            os.close(read_fd)
+            if write_fd is not None:
+                os.close(write_fd)
+        if not number.isdigit():
+            self.xvfb.kill()
+            raise RuntimeError("Xvfb did not start")
+        self.display_number = int(number)
+        self._wait_for_socket()
+
+    def _wait_for_window(self):
+        """Wait until the browser window is mapped, so the first screenshot shows it"""
+        try:
+            subprocess.run(["xdotool", "search", "--sync", "--onlyvisible", "--name", "."],
+                           env=self.env, timeout=self.start_timeout, check=False,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            logger.warning(f"Browser window did not appear on {self.display_name}")
+
+    def _wait_for_socket(self):
+        deadline = time.monotonic() + self.start_timeout
+        while not os.path.exists(f"/tmp/.X11-unix/X{self.display_number}"):
+            if self.xvfb.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Xvfb {self.display_name} did not start")
+            time.sleep(0.05)
+
+    @property
+    def display(self):
+        """Xlib connection to the virtual display (XTest input)"""
+        if self._display is None:
+            self.start()
+            from Xlib import display as xdisplay
+            self._display = xdisplay.Display(self.display_name)
+        return self._display
+
+    def _fake(self, event_type: int, detail: int = 0, x: int = 0, y: int = 0):
+        from Xlib.ext import xtest
+        xtest.fake_input(self.display, event_type, detail, x=x, y=y)
+        self.display.sync()
+
+    def screen_size(self):
+        return self.size
+
+    def screenshot(self):
+        from PIL import Image
+        self.start()
+        try:
+            import mss
+        except ImportError:
+            mss = None
+        if mss is not None:
+            if self._capture is None:
+                self._capture = mss.mss(display=self.display_name)
+            shot = self._capture.grab(self._capture.monitors[1])
+            return Image.frombytes("RGB", shot.size, shot.rgb)
+        from Xlib import X
+        width, height = self.size
+        root = self.display.screen().root
+        raw = root.get_image(0, 0, width, height, X.ZPixmap, 0xFFFFFFFF)
+        return Image.frombytes("RGB", (width, height), raw.data, "raw", "BGRX")
+
+    def mouse_position(self):
+        pointer = self.display.screen().root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def move_mouse(self, x, y):
+        from Xlib import X
+        self._fake(X.MotionNotify, x=int(x), y=int(y))
+
+    def mouse_down(self):
+        from Xlib import X
+        self._fake(X.ButtonPress, 1)
+
+    def mouse_up(self):
+        from Xlib import X
+        self._fake(X.ButtonRelease, 1)
+
+    def scroll(self, direction, clicks):
+        from Xlib import X
+        button = _SCROLL_BUTTONS[direction]
+        # One X wheel step scrolls about as far as 100 pyautogui units on Windows
+        for _ in range(max(1, abs(clicks) // 100)):
+            self._fake(X.ButtonPress, button)
+            self._fake(X.ButtonRelease, button)
+
+    def _xdotool(self, *args: str):
+        self.start()
+        subprocess.run(["xdotool", *args], env=self.env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def press(self, key):
+        self._xdotool("key", "--clearmodifiers", _X_KEYS.get(key.lower(), key))
+
+    def hotkey(self, *keys):
+        combo = "+".join(_X_KEYS.get(key.lower(), key) for key in keys)
+        self._xdotool("key", "--clearmodifiers", combo)
+
+    def type_text(self, text):
+        self._xdotool("type", "--delay", "20", "--", text)
+
+    def _browser_command(self, url: str) -> List[str]:
+        if self.browser is None:
+            raise RuntimeError("No browser found - set LAZYQA_BROWSER")
+        if self.profile_dir is None:
+            self.profile_dir = tempfile.mkdtemp(prefix="lazyqa-browser-")
+        width, height = self.size
+        if "firefox" in os.path.basename(self.browser):
+            return [self.browser, "--profile", self.profile_dir, "--new-tab", url]
+        return [self.browser, f"--user-data-dir={self.profile_dir}", "--no-first-run",
+                "--no-default-browser-check", f"--window-size={width},{height}",
+                "--window-position=0,0", url]
+
+    def open_url(self, url):
+        self.start()
+        # start() launches the browser on about:blank, later calls open a tab in it
+        process = subprocess.Popen(self._browser_command(url), env=self.env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.browser_process is None or self.browser_process.poll() is not None:
+            self.browser_process = process
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+        for process in (self.browser_process, self.xvfb):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.browser_process = self.xvfb = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+def create_executor(kind: str = "local", size: Optional[Tuple[int, int]] = None) -> Executor:
+    """Executor by name: "local" (physical screen) or "xvfb" (private virtual display)"""
+    if kind == "local":
+        return LocalDesktopExecutor()
+    if kind == "xvfb":
+        return XvfbExecutor(size=size or (1280, 800))
+    raise ValueError(f"Unknown executor: {kind}")
@@ -1,60 +1,85 @@
 """
 GUI Client for Computer Use Server
 Client executes actions locally and sends results back to server
+
+Screen and input go through an executor (executors.py): the physical
+desktop by default, or a private Xvfb display per client (--executor xvfb)
+so several agents can run on one machine. Their libraries are imported on
+first use, so the window opens without waiting for them.
 """
 
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 import requests
 import base64
-from PIL import ImageGrab, Image
 import json
 import time
-import pyautogui
-import keyboard
 import random
 import math
-from pynput.mouse import Controller as MouseController, Button
-from pynput.keyboard import Controller as KeyboardController
+import argparse
+import threading
+from io import BytesIO
+
+from blob_store import BlobStore
+from actions import validate_action, ActionError
+from executors import Executor, create_executor
+
+# Local screenshots older than this are deleted on startup
+SCREENSHOT_RETENTION_DAYS = 7
+
+# Server overload handling (429/503 + Retry-After)
+MAX_BUSY_RETRIES = 10
+MAX_BUSY_WAIT = 60
+
+# Iterations per task - also sent to the server as the session's model call budget
+MAX_ITERATIONS = 30
 
 
 class ComputerUseClient:
-    def __init__(self, root):
+    def __init__(self, root, executor: Executor = None, server_url="http://127.0.0.1:8080"):
         self.root = root
         self.root.title("Computer Use Client")
         self.root.geometry("900x700")
         
-        self.server_url = "http://127.0.0.1:8080"
+        self.server_url = server_url
         self.session_id = None
         self.current_url = "about:blank"
         self.iteration = 0
         
-        # Get screen dimensions
-        self.screen_width = pyautogui.size()[0]
-        self.screen_height = pyautogui.size()[1]
+        # Screen and input devices the agent works on
+        self.executor = executor or create_executor("local")
         
-        # Initialize pynput controllers
-        self.mouse = MouseController()
-        self.kbd = KeyboardController()
+        # Screenshot log - identical frames are stored once
+        self.screenshots = BlobStore("Screen")
+        threading.Thread(target=self.screenshots.prune, daemon=True,
+                         kwargs={"max_age": SCREENSHOT_RETENTION_DAYS * 24 * 3600}).start()
         
         self.setup_ui()
     
+    @property
+    def screen_width(self):
+        return self.executor.screen_size()[0]
+    
+    @property
+    def screen_height(self):
+        return self.executor.screen_size()[1]
+    
     def human_like_mouse_move(self, target_x, target_y):
         """
-        Move mouse to target position with human-like behavior using pynput:
+        Move mouse to target position with human-like behavior:
         - Curved path (bezier curve)
         - Variable speed (fast then slow)
         - Overshooting and correction (3 attempts)
         - Small adjustments at the end
         """
-        start_x, start_y = self.mouse.position
+        start_x, start_y = self.executor.mouse_position()
         
         # Calculate distance
         distance = math.sqrt((target_x - start_x)**2 + (target_y - start_y)**2)
         
         # If distance is very small, just move directly
         if distance < 5:
-            self.mouse.position = (target_x, target_y)
+            self.executor.move_mouse(target_x, target_y)
             return
         
         # === FIRST ATTEMPT: Overshoot (miss by larger radius) ===
@@ -91,7 +116,7 @@ class ComputerUseClient:
                 3*(1-t_eased) * t_eased**2 * cp2_y + \
                 t_eased**3 * overshoot_y
             
-            self.mouse.position = (int(x), int(y))
+            self.executor.move_mouse(int(x), int(y))
             # Small delay for smoother movement (25% slower)
             time.sleep(0.00005)
         
@@ -106,7 +131,7 @@ class ComputerUseClient:
         
         # Quick correction with smaller curve - FASTER
         correction_steps = random.randint(5, 8)  # Fewer steps (was 10-18)
-        current_x, current_y = self.mouse.position
+        current_x, current_y = self.executor.mouse_position()
         
         for i in range(correction_steps + 1):
             t = i / correction_steps
@@ -118,7 +143,7 @@ class ComputerUseClient:
             jitter_x = random.uniform(-0.5, 0.5)
             jitter_y = random.uniform(-0.5, 0.5)
             
-            self.mouse.position = (int(x + jitter_x), int(y + jitter_y))
+            self.executor.move_mouse(int(x + jitter_x), int(y + jitter_y))
             time.sleep(0.0001)  # Almost instant
         
         # Very short pause
@@ -126,7 +151,7 @@ class ComputerUseClient:
         
         # === THIRD ATTEMPT: Final precise movement ===
         final_steps = random.randint(3, 6)  # Fewer steps (was 6-12)
-        current_x, current_y = self.mouse.position
+        current_x, current_y = self.executor.mouse_position()
         
         for i in range(final_steps + 1):
             t = i / final_steps
@@ -144,11 +169,11 @@ class ComputerUseClient:
                 jitter_x = 0
                 jitter_y = 0
             
-            self.mouse.position = (int(x + jitter_x), int(y + jitter_y))
+            self.executor.move_mouse(int(x + jitter_x), int(y + jitter_y))
             time.sleep(0.0001)  # Almost instant
         
         # Ensure final position is exact
-        self.mouse.position = (target_x, target_y)
+        self.executor.move_mouse(target_x, target_y)
         time.sleep(random.uniform(0.001, 0.003))  # Very short final pause
         
     def normalize_x(self, x: int) -> int:
@@ -158,6 +183,10 @@ class ComputerUseClient:
     def normalize_y(self, y: int) -> int:
         """Convert normalized y coordinate (0-1000) to actual pixel coordinate."""
         return int(y / 1000 * self.screen_height)
+    
+    def to_screen(self, x: int, y: int) -> tuple:
+        """Convert normalized (0-999) point from server to screen pixels"""
+        return self.normalize_x(x), self.normalize_y(y)
         
     def setup_ui(self):
         # Task input
@@ -228,24 +257,20 @@ class ComputerUseClient:
         
     def capture_screenshot(self):
         """Capture, save, and encode screenshot - resized to 50% for faster transmission"""
+        from PIL import Image
         try:
-            screenshot = ImageGrab.grab()
+            screenshot = self.executor.screenshot()
             # Resize to 50% (2x smaller by pixels)
             original_width, original_height = screenshot.size
             new_width = original_width // 2
             new_height = original_height // 2
             screenshot = screenshot.resize((new_width, new_height), Image.LANCZOS)
-            # Save screenshot to Screen/ folder
-            import os
-            os.makedirs("Screen", exist_ok=True)    
-            session_id = self.session_id if self.session_id else "init"
-            filename = f"Screen/{session_id}_iter{self.iteration+1}_{time.strftime('%Y%m%d_%H%M%S')}.png"
-            screenshot.save(filename, format="PNG")
-            self.log(f"Screenshot saved: {filename}", "INFO")
-            from io import BytesIO
             buffer = BytesIO()
             screenshot.save(buffer, format="PNG")
             img_bytes = buffer.getvalue()
+            # Save screenshot to Screen/ blob store (same id as on the server)
+            blob_id = self.screenshots.put(img_bytes)
+            self.log(f"Screenshot saved: iteration {self.iteration+1}, blob {blob_id[:12]}", "INFO")
             return base64.b64encode(img_bytes).decode('utf-8')
         except Exception as e:
             self.log(f"Screenshot error: {e}", "ERROR")
@@ -259,10 +284,42 @@ class ComputerUseClient:
         except:
             return False
     
+    def post(self, path, payload):
+        """POST to server, waiting and retrying while it answers 429/503 (busy)"""
+        for attempt in range(MAX_BUSY_RETRIES + 1):
+            response = requests.post(f"{self.server_url}{path}", json=payload, timeout=60)
+            if response.status_code not in (429, 503) or attempt == MAX_BUSY_RETRIES:
+                break
+            
+            try:
+                delay = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                delay = 2 ** attempt
+            delay = min(delay, MAX_BUSY_WAIT) * random.uniform(1.0, 1.2)  # Jitter spreads retries
+            
+            self.log(f"⏳ Server busy ({response.status_code}), retrying in {delay:.1f}s...", "WARNING")
+            self.status_label.config(text=f"Server busy - retrying in {delay:.0f}s", fg="orange")
+            deadline = time.time() + delay
+            while time.time() < deadline:
+                self.root.update()  # Keep window responsive while waiting
+                time.sleep(0.1)
+        
+        response.raise_for_status()
+        return response
+    
     def execute_action(self, action):
         """Execute a single action locally using Computer Use functions"""
+        # Server already validated it - this also handles older servers
+        try:
+            action = validate_action(action)
+        except ActionError as e:
+            self.log(f"  ⚠ {e}", "WARNING")
+            return {"name": action.get("name", ""), "call": action.get("call", action.get("name", "")),
+                    "success": False, "error": str(e)}
         name = action["name"]
-        args = action.get("args", {})
+        call = action["call"]
+        args = action["args"]
+        executor = self.executor
         
         self.log(f"  🔧 {name.upper()}", "ACTION")
         self.log(f"     Args: {json.dumps(args, indent=8)}", "ACTION")
@@ -274,25 +331,15 @@ class ComputerUseClient:
                 
             elif name == "navigate":
                 url = args.get("url", "")
-                import webbrowser
-                webbrowser.open(url)
+                executor.open_url(url)
                 self.current_url = url
                 self.log(f"     ✓ Navigated to: {url}", "SUCCESS")
                 time.sleep(2)
                 result = "success"
                 
-            elif name == "click_at" or name == "click":
-                # Handle both normalized (0-1000) and direct pixel coordinates
-                x = args.get("x", 0)
-                y = args.get("y", 0)
-                
-                # If x or y are > 1000, assume they're already pixel coordinates
-                if x <= 1000 and y <= 1000:
-                    actual_x = self.normalize_x(x)
-                    actual_y = self.normalize_y(y)
-                else:
-                    actual_x = x
-                    actual_y = y
+            elif name == "click_at":
+                # Coordinates are normalized (0-999) by validate_action
+                actual_x, actual_y = self.to_screen(args["x"], args["y"])
                 
                 self.log(f"     ✓ Clicking at ({actual_x}, {actual_y})", "SUCCESS")
                 
@@ -301,24 +348,15 @@ class ComputerUseClient:
                 
                 # Click with small random delay
                 time.sleep(random.uniform(0.05, 0.15))
-                self.mouse.click(Button.left, 1)
+                executor.click()
                 time.sleep(0.5)
                 result = "success"
                 
-            elif name == "type_text_at" or name == "type":
-                x = args.get("x", 0)
-                y = args.get("y", 0)
-                text = args.get("text", "")
-                press_enter = args.get("press_enter", False)
-                clear_before_typing = args.get("clear_before_typing", True)
-                
-                # Normalize coordinates if needed
-                if x <= 1000 and y <= 1000:
-                    actual_x = self.normalize_x(x)
-                    actual_y = self.normalize_y(y)
-                else:
-                    actual_x = x
-                    actual_y = y
+            elif name == "type_text_at":
+                text = args["text"]
+                press_enter = args["press_enter"]
+                clear_before_typing = args["clear_before_typing"]
+                actual_x, actual_y = self.to_screen(args.get("x", 0), args.get("y", 0))
                 
                 self.log(f"     ✓ Typing '{text}' at ({actual_x}, {actual_y})", "SUCCESS")
                 
@@ -327,56 +365,96 @@ class ComputerUseClient:
                     # Use human-like mouse movement
                     self.human_like_mouse_move(actual_x, actual_y)
                     time.sleep(random.uniform(0.05, 0.15))
-                    self.mouse.click(Button.left, 1)
+                    executor.click()
                     time.sleep(0.2)
                 
                 # Clear existing text if requested
                 if clear_before_typing and (actual_x > 0 or actual_y > 0):
-                    pyautogui.hotkey('ctrl', 'a')
-                    pyautogui.press('backspace')
+                    executor.hotkey('ctrl', 'a')
+                    executor.press('backspace')
                     time.sleep(0.1)
                 
-                # Use keyboard library for Unicode text input (supports all languages)
-                keyboard.write(text, delay=0.02)
+                # Unicode text input (supports all languages)
+                executor.type_text(text)
                 time.sleep(0.1)
                 
                 # Press enter if requested
                 if press_enter:
                     time.sleep(0.3)
-                    pyautogui.press('enter')
+                    executor.press('enter')
                 
                 time.sleep(0.5)
                 result = "success"
                 
             elif name == "scroll":
-                direction = args.get("direction", "down")
-                amount = args.get("amount", 3)
+                direction = args["direction"]
+                amount = args["amount"]
                 
-                scroll_amount = -amount if direction == "down" else amount
                 self.log(f"     ✓ Scrolling {direction} by {amount}", "SUCCESS")
-                pyautogui.scroll(scroll_amount * 100)
+                executor.scroll(direction, amount * 100)
+                time.sleep(0.3)
+                result = "success"
+                
+            elif name == "scroll_at":
+                actual_x, actual_y = self.to_screen(args["x"], args["y"])
+                self.log(f"     ✓ Scrolling {args['direction']} at ({actual_x}, {actual_y})", "SUCCESS")
+                self.human_like_mouse_move(actual_x, actual_y)
+                # magnitude is in the same 0-999 scale as coordinates
+                executor.scroll(args["direction"], max(args["magnitude"] // 2, 100))
                 time.sleep(0.3)
                 result = "success"
                 
-            elif name == "key" or name == "press_key":
-                key = args.get("key", "")
+            elif name == "hover_at":
+                actual_x, actual_y = self.to_screen(args["x"], args["y"])
+                self.log(f"     ✓ Hovering at ({actual_x}, {actual_y})", "SUCCESS")
+                self.human_like_mouse_move(actual_x, actual_y)
+                time.sleep(0.5)
+                result = "success"
+                
+            elif name == "drag_and_drop":
+                start_x, start_y = self.to_screen(args["x"], args["y"])
+                end_x, end_y = self.to_screen(args["destination_x"], args["destination_y"])
+                self.log(f"     ✓ Dragging ({start_x}, {start_y}) → ({end_x}, {end_y})", "SUCCESS")
+                self.human_like_mouse_move(start_x, start_y)
+                executor.mouse_down()
+                time.sleep(0.2)
+                self.human_like_mouse_move(end_x, end_y)
+                time.sleep(0.2)
+                executor.mouse_up()
+                time.sleep(0.5)
+                result = "success"
+                
+            elif name == "go_back" or name == "go_forward":
+                direction = "left" if name == "go_back" else "right"
+                self.log(f"     ✓ Browser {name.replace('go_', '')}", "SUCCESS")
+                executor.hotkey("alt", direction)
+                time.sleep(1)
+                result = "success"
+                
+            elif name == "wait_5_seconds":
+                self.log("     ✓ Waiting 5 seconds", "SUCCESS")
+                time.sleep(5)
+                result = "success"
+                
+            elif name == "key":
+                key = args["key"]
                 self.log(f"     ✓ Pressing key: {key}", "SUCCESS")
-                pyautogui.press(key)
+                executor.press(key)
                 time.sleep(0.3)
                 result = "success"
                 
             elif name == "hotkey":
-                keys = args.get("keys", [])
-                # Convert "win" to proper key name for pyautogui
+                keys = args["keys"]
+                # Convert "win" to proper key name for the executor
                 normalized_keys = []
                 for key in keys:
                     if key.lower() == "win":
-                        normalized_keys.append("win")  # pyautogui uses "win" for Windows key
+                        normalized_keys.append("win")  # Executors map "win" to the system key
                     else:
                         normalized_keys.append(key.lower())
                 
                 self.log(f"     ✓ Pressing hotkey: {'+'.join(normalized_keys)}", "SUCCESS")
-                pyautogui.hotkey(*normalized_keys)
+                executor.hotkey(*normalized_keys)
                 
                 # Give extra time for system actions (Win menu, Alt+Tab, etc.)
                 if "win" in normalized_keys or "alt" in normalized_keys:
@@ -388,9 +466,8 @@ class ComputerUseClient:
             
             elif name == "search":
                 query = args.get("query", "")
-                import webbrowser
                 search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-                webbrowser.open(search_url)
+                executor.open_url(search_url)
                 self.current_url = search_url
                 self.log(f"     ✓ Searched for: {query}", "SUCCESS")
                 time.sleep(2)
@@ -400,11 +477,11 @@ class ComputerUseClient:
                 self.log(f"     ⚠ Unknown action: {name}", "WARNING")
                 result = "unknown_function"
             
-            return {"name": name, "success": True, "result": result}
+            return {"name": name, "call": call, "success": True, "result": result}
             
         except Exception as e:
             self.log(f"     ✗ Error: {e}", "ERROR")
-            return {"name": name, "success": False, "error": str(e)}
+            return {"name": name, "call": call, "success": False, "error": str(e)}
     
     def start_task(self):
         """Start new task and auto-execute until complete"""
@@ -437,15 +514,11 @@ class ComputerUseClient:
             self.log("📤 Sending request to AI server...")
             self.status_label.config(text="Waiting for AI response...", fg="orange")
             
-            response = requests.post(
-                f"{self.server_url}/api/v1/start",
-                json={
-                    "prompt": task,
-                    "screenshot": screenshot
-                },
-                timeout=60
-            )
-            response.raise_for_status()
+            response = self.post("/api/v1/start", {
+                "prompt": task,
+                "screenshot": screenshot,
+                "budget": {"max_turns": MAX_ITERATIONS}
+            })
             
             result = response.json()
             self.session_id = result["session_id"]
@@ -491,7 +564,7 @@ class ComputerUseClient:
             messagebox.showerror("Error", str(e))
             self.start_btn.config(state="normal")
     
-    def auto_continue_loop(self, max_iterations=30):
+    def auto_continue_loop(self, max_iterations=MAX_ITERATIONS):
         """Auto-execute continuation loop until task completes"""
         try:
             while self.iteration < max_iterations:
@@ -508,17 +581,12 @@ class ComputerUseClient:
                 self.log("📤 Sending execution results to AI...")
                 self.status_label.config(text=f"Iteration {self.iteration + 1} - Waiting for AI...", fg="orange")
                 
-                response = requests.post(
-                    f"{self.server_url}/api/v1/continue",
-                    json={
-                        "session_id": self.session_id,
-                        "screenshot": screenshot,
-                        "current_url": self.current_url,
-                        "function_results": self.function_results
-                    },
-                    timeout=60
-                )
-                response.raise_for_status()
+                response = self.post("/api/v1/continue", {
+                    "session_id": self.session_id,
+                    "screenshot": screenshot,
+                    "current_url": self.current_url,
+                    "function_results": self.function_results
+                })
                 
                 result = response.json()
                 
@@ -532,6 +600,11 @@ class ComputerUseClient:
                     self.log(f"{result['reasoning']}\n")
                 
                 # Check if complete
+                if (result.get("budget") or {}).get("exceeded"):
+                    self.log(f"\n⚠️ Stopped by server: {result.get('reasoning')}", "WARNING")
+                    self.status_label.config(text="Incomplete - Session budget exceeded", fg="orange")
+                    self.start_btn.config(state="normal")
+                    return
                 if result["is_complete"]:
                     self.log("\n" + "="*60, "SUCCESS")
                     self.log("✅ TASK COMPLETE!", "SUCCESS")
@@ -574,9 +647,25 @@ class ComputerUseClient:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Computer Use Client")
+    parser.add_argument("--server", default="http://127.0.0.1:8080")
+    parser.add_argument("--executor", choices=["local", "xvfb"], default="local",
+                        help="local: this screen; xvfb: private virtual display (Linux)")
+    parser.add_argument("--screen", default="1280x800",
+                        help="Virtual display size for --executor xvfb")
+    args = parser.parse_args()
+    
+    width, height = (int(v) for v in args.screen.lower().split("x"))
+    executor = create_executor(args.executor, size=(width, height))
     root = tk.Tk()
-    app = ComputerUseClient(root)
-    root.mainloop()
+    try:
+        ComputerUseClient(root, executor=executor, server_url=args.server)
+        if args.executor == "xvfb":
+            executor.start()
+            root.title(f"Computer Use Client - display {executor.display_name}")
+        root.mainloop()
+    finally:
+        executor.close()
 
 
 if __name__ == "__main__":
@@ -2,51 +2,46 @@
 Simplified Computer Use Server
 Middleman between client and Google Gemini Computer Use AI
 Server sends actions to client, client executes and sends results back
+
+Importing this module only defines the routes: create_app() opens the stores,
+sets up the sessions, limits and event bus, and builds the app; model SDKs are
+loaded on the first model call. The state is module-wide, so one process serves
+one app at a time. `uvicorn main:app` still works - `app` is created on first access.
 """
 
+import os
+import copy
+import asyncio
 import base64
+import time
 import uuid
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from google import genai
-from google.genai import types
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
-# Initialize FastAPI
-app = FastAPI(title="Computer Use Server", version="1.0.0")
+from blob_store import BlobStore
+from session_store import SessionStore, SessionCorrupt
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+from resilience import ResilientCaller, CircuitBreaker, CircuitOpen
+from actions import validate_actions, png_size
+from reports import ReportStore
+from bulk_cases import router as bulk_cases_router
+from events import EventBus
+from budget import BudgetExceeded, make_budget, check_budget, budget_report
+from backends import ModelBackend, backends_from_env
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+if TYPE_CHECKING:
+    from google.genai import types
 
-# Load API key
-def load_api_key() -> str:
-    """Load API key from condig.txt.
-    
-    Supports formats:
-    - AI_API = "key"
-    - GOOGLE_API_KEY="key"
-    - Raw key without =
-    """
-    with open('condig.txt', 'r', encoding='utf-8') as f:
-        content = f.read().strip()
-        if '=' in content:
-            # Extract value after = and remove quotes
-            return content.split('=', 1)[1].strip().strip('"').strip("'")
-        return content
+logger = logging.getLogger(__name__)
 
+router = APIRouter()
 
 def load_system_instruction() -> str:
     """Load system instruction from prompt.txt"""
@@ -57,20 +52,80 @@ def load_system_instruction() -> str:
         logger.error("prompt.txt not found! Using default instruction.")
         return "You are a computer control assistant."
 
-# Configure Gemini
-API_KEY = load_api_key()
-client = genai.Client(api_key=API_KEY)
-MODEL_NAME = "gemini-2.5-computer-use-preview-10-2025"
+# Model backends by name (see backends.py), set up by create_app().
+# Each session is served by the backend named in its start request.
+model_backends: Dict[str, ModelBackend] = {}
+DEFAULT_BACKEND = os.environ.get("LAZYQA_MODEL_BACKEND", "gemini")
+
 
 # Session storage - stores conversation history
+# In-memory cache over session_store; sessions are checkpointed after each turn
 sessions: Dict[str, Any] = {}
 
+# Opened by create_app(): screenshots, session checkpoints and finished
+# sessions recorded as test runs for reports
+blob_store: Optional[BlobStore] = None
+session_store: Optional[SessionStore] = None
+report_store: Optional[ReportStore] = None
+
+# Live per-iteration events for web viewers (GET /api/v1/events), created by create_app()
+event_bus: Optional[EventBus] = None
+
+# Stored sessions and screenshots unused for this many days are deleted (0 = keep forever)
+RETENTION_DAYS = float(os.environ.get("LAZYQA_RETENTION_DAYS", "0"))
+
+# Multi-worker mode (see cluster.py) - worker id is prefixed to session ids
+# so the router can send every request of a session to the same worker
+WORKER_ID = os.environ.get("LAZYQA_WORKER_ID")
+
+# Sessions without a request for this long no longer block a drain or hold a slot
+SESSION_IDLE_TIMEOUT = int(os.environ.get("LAZYQA_SESSION_IDLE_TIMEOUT", "300"))
+
+# Set by /api/v1/admin/drain before a restart - new sessions are refused
+server_state: Dict[str, Any] = {"draining": False}
+
+# Admission control - over these limits requests wait in a bounded queue, then get 429.
+# Created by create_app() from the LAZYQA_* limits.
+admission: Optional[AdmissionController] = None
+model_calls: Optional[TokenBucket] = None
+
+# Retries, optional hedged requests and circuit breaker around model calls -
+# one per backend, so a failing local model does not open Gemini's circuit
+model_callers: Dict[str, ResilientCaller] = {}
+
+
+def caller_for(backend: str) -> ResilientCaller:
+    if backend not in model_callers:
+        model_callers[backend] = ResilientCaller(
+            retries=int(os.environ.get("LAZYQA_MODEL_RETRIES", "3")),
+            hedge=os.environ.get("LAZYQA_MODEL_HEDGE", "0") == "1",
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get("LAZYQA_CIRCUIT_FAILURES", "5")),
+                reset_timeout=float(os.environ.get("LAZYQA_CIRCUIT_RESET", "30")),
+            ),
+        )
+    return model_callers[backend]
+
+# Max model turns answered by the server alone (calls needing no client action)
+MAX_LOCAL_TURNS = 3
+
 
 # === Models ===
 
+class BudgetRequest(BaseModel):
+    """Per-session limits (capped by the server's LAZYQA_MAX_* limits)"""
+    max_turns: Optional[int] = None
+    max_input_bytes: Optional[int] = None
+    max_input_tokens: Optional[int] = None
+    max_seconds: Optional[int] = None
+
+
 class StartRequest(BaseModel):
     prompt: str
     screenshot: str
+    case: Optional[str] = None  # Test case name/id for reports (default: prompt)
+    budget: Optional[BudgetRequest] = None
+    model: Optional[str] = None  # Backend name (default: LAZYQA_MODEL_BACKEND)
 
 
 class ContinueRequest(BaseModel):
@@ -85,6 +140,8 @@ class ActionResponse(BaseModel):
     actions: List[Dict[str, Any]]
     reasoning: Optional[str] = None
     is_complete: bool
+    rejected_actions: List[Dict[str, Any]] = []  # Calls the client cannot execute
+    budget: Optional[Dict[str, Any]] = None  # Limits, usage and which limit was exceeded
 
 
 # === Helper Functions ===
@@ -130,31 +187,343 @@ def extract_actions(response) -> tuple[List[Dict], str, bool]:
     return actions, reasoning, is_complete
 
 
+def function_response_part(name: str, url: str, error: Optional[str] = None) -> "types.Part":
+    """Function response telling the model the result of one of its calls"""
+    from google.genai import types
+    response = {"url": url}
+    if error:
+        response["error"] = error
+    return types.Part(function_response={"name": name, "response": response})
+
+
+def contents_bytes(contents: List["types.Content"]) -> int:
+    """Approximate size of a model request - text, images, function calls and responses"""
+    total = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                total += len(part.text.encode("utf-8"))
+            if part.inline_data and part.inline_data.data:
+                total += len(part.inline_data.data)
+            if part.function_call:
+                total += len(str(part.function_call.args or {}))
+            if part.function_response:
+                total += len(str(part.function_response.response or {}))
+    return total
+
+
+async def call_model(session: Dict[str, Any]):
+    """
+    Send session history to the model, recording call time and input for reports
+    Every upstream request (retries and hedges included) takes a rate limit
+    token and is charged to the session's input budget. Raises BudgetExceeded
+    instead of calling when the session is out of budget.
+    """
+    input_bytes = contents_bytes(session["contents"])
+    stats = session["stats"]
+    name = session.get("backend") or DEFAULT_BACKEND
+    backend = model_backends.get(name)
+    if backend is None:
+        raise RuntimeError(f"Model backend {name!r} is not configured")
+
+    async def before_attempt():
+        check_budget(session, input_bytes)
+        await model_calls.acquire()
+        stats["input_bytes"] = stats.get("input_bytes", 0) + input_bytes
+
+    started = time.monotonic()
+    response = await caller_for(name).call(
+        backend.generate,
+        session["contents"],
+        session["config"],
+        before_attempt=before_attempt,
+    )
+    stats["model_calls"] += 1
+    stats["model_seconds"] += time.monotonic() - started
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata and usage_metadata.prompt_token_count:
+        stats["input_tokens"] = stats.get("input_tokens", 0) + usage_metadata.prompt_token_count
+    return response
+
+
+def new_stats() -> Dict[str, Any]:
+    return {"turns": 0, "model_calls": 0, "model_seconds": 0.0, "actions": {},
+            "input_bytes": 0, "input_tokens": 0}
+
+
+async def budget_exhausted(session_id: str, session: Dict[str, Any],
+                           e: BudgetExceeded) -> ActionResponse:
+    """End a session that ran out of budget - recorded as a failed run"""
+    logger.warning(f"Session {session_id}: {e}")
+    session["is_complete"] = True
+    session["budget_exceeded"] = e.limit
+    sessions[session_id] = session
+    finish_session(session_id, session, "failed")
+    await admission.release(session_id)
+    session_store.checkpoint(session_id, session)
+    return ActionResponse(
+        session_id=session_id,
+        actions=[],
+        reasoning=str(e),
+        is_complete=True,
+        budget=budget_report(session)
+    )
+
+
+def finish_session(session_id: str, session: Dict[str, Any], status: str):
+    """Record session as a test run (once)"""
+    if session.get("reported"):
+        return
+    session["reported"] = True
+    event_bus.publish("status", session_id, case=session.get("case"), status=status,
+                      turn=session.get("stats", {}).get("turns", 0))
+    try:
+        report_store.record_run(session_id, session, status)
+    except OSError as e:
+        logger.error(f"Session {session_id}: could not record run: {e}")
+
+
+def publish_iteration(session_id: str, session: Dict[str, Any], reasoning: str,
+                      actions: List[Dict], rejected: List[Dict], is_complete: bool):
+    """Tell live viewers what the agent saw and decided this turn"""
+    screenshot_id = session["screenshots"][-1] if session.get("screenshots") else None
+    event_bus.publish(
+        "iteration", session_id,
+        case=session.get("case"),
+        turn=session["stats"]["turns"],
+        status="completed" if is_complete else "running",
+        reasoning=reasoning,
+        actions=[{"name": a["name"], "args": a["args"]} for a in actions],
+        rejected=rejected,
+        current_url=session.get("current_url"),
+        screenshot=screenshot_id,
+        thumbnail=f"/api/v1/blobs/{screenshot_id}?thumbnail=true" if screenshot_id else None,
+    )
+
+
+async def prepare_actions(session: Dict[str, Any], response) -> tuple[List[Dict], str, bool, List[Dict]]:
+    """
+    Validate model function calls and return what the client should execute
+    Calls the server can answer itself (local actions like open_web_browser,
+    rejected calls) are stored in session["pending_results"] and answered
+    with the next turn. If nothing is left for the client, the server answers
+    them right away instead of a client round trip.
+    """
+    from google.genai import types
+    contents = session["contents"]
+    stats = session["stats"]
+    rejected = []
+    reasonings = []  # Of every model turn, server-answered ones included
+    for turn in range(MAX_LOCAL_TURNS + 1):
+        actions, reasoning, is_complete = extract_actions(response)
+        if reasoning:
+            reasonings.append(reasoning)
+        validated = validate_actions(actions, session.get("screen_size"))
+        # Every call of every turn counts, also the ones answered by the server
+        for action in validated.client + validated.local + validated.rejected:
+            stats["actions"][action["name"]] = stats["actions"].get(action["name"], 0) + 1
+        rejected.extend(validated.rejected)
+        for item in validated.rejected:
+            logger.warning(f"Rejected action {item['name']}: {item['error']}")
+        pending = [{"name": action["call"]} for action in validated.local]
+        pending += [{"name": item["name"], "error": item["error"]} for item in validated.rejected]
+        
+        if validated.client or not pending or turn == MAX_LOCAL_TURNS:
+            session["pending_results"] = pending
+            stats["turns"] += 1
+            return validated.client, "\n".join(reasonings), is_complete, rejected
+        
+        logger.info(f"Answering {len(pending)} calls on the server (no client round trip)")
+        url = session.get("current_url", "about:blank")
+        screenshot_id = session["screenshots"][-1]
+        parts = [function_response_part(item["name"], url, item.get("error")) for item in pending]
+        parts.append(types.Part(inline_data={"mime_type": blob_store.mime_type(screenshot_id),
+                                             "data": blob_store.get(screenshot_id)}))
+        contents.append(types.Content(parts=parts))
+        response = await call_model(session)
+        contents.append(response.candidates[0].content)
+
+
+def new_session_id() -> str:
+    """Create session id, prefixed with worker id in multi-worker mode"""
+    session_id = str(uuid.uuid4())
+    if WORKER_ID:
+        return f"{WORKER_ID}-{session_id}"
+    return session_id
+
+
+def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get session from memory, restoring it from disk on first access after restart
+    Raises SessionCorrupt if its stored history cannot be restored.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        session = session_store.load(session_id)
+        if session is not None:
+            session["last_active"] = time.monotonic()
+            sessions[session_id] = session
+    return session
+
+
+def too_busy(e: AdmissionRejected) -> HTTPException:
+    """429 response telling the client when to retry"""
+    logger.warning(f"Rejected: {e} (retry after {e.retry_after}s)")
+    return HTTPException(status_code=429, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after)})
+
+
+def upstream_down(e: CircuitOpen) -> HTTPException:
+    """503 while the model circuit is open - client retries after Retry-After"""
+    logger.warning(str(e))
+    return HTTPException(status_code=503, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after)})
+
+
+def count_active_sessions() -> int:
+    """Count sessions that are still running (not complete and not idle)"""
+    now = time.monotonic()
+    return sum(
+        1 for data in sessions.values()
+        if not data.get("is_complete")
+        and now - data.get("last_active", 0) < SESSION_IDLE_TIMEOUT
+    )
+
+
+def apply_retention(in_use: set):
+    """
+    Delete old stored sessions, then old screenshots nothing refers to anymore:
+    not a session in memory (in_use) or on disk, nor a run record (report thumbnails)
+    """
+    max_age = RETENTION_DAYS * 24 * 3600
+    removed = session_store.prune(max_age)
+    keep = set(in_use)
+    keep.update(session_store.iter_blob_ids())
+    keep.update(report_store.iter_blob_ids())
+    pruned = blob_store.prune(max_age=max_age, keep=keep)
+    logger.info(f"Retention: removed {removed} sessions and {pruned} screenshots")
+
+
+async def retention_loop():
+    while True:
+        in_use = {blob_id for data in sessions.values() for blob_id in data.get("screenshots", [])}
+        await asyncio.to_thread(apply_retention, in_use)
+        await asyncio.sleep(3600)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Retention runs while the app is up; reports are flushed on shutdown"""
+    retention = asyncio.create_task(retention_loop()) if RETENTION_DAYS > 0 else None
+    try:
+        yield
+    finally:
+        if retention is not None:
+            retention.cancel()
+        report_store.flush()
+
+
+def create_app() -> FastAPI:
+    """Open the stores, reset the per-process state and build the FastAPI app"""
+    global blob_store, session_store, report_store, event_bus, admission, model_calls
+    logging.basicConfig(level=logging.INFO)
+    sessions.clear()
+    model_callers.clear()
+    server_state["draining"] = False
+    event_bus = EventBus(max_buffer=int(os.environ.get("LAZYQA_EVENT_BUFFER", "100")))
+    admission = AdmissionController(
+        max_active=int(os.environ.get("LAZYQA_MAX_ACTIVE_SESSIONS", "32")),
+        max_waiting=int(os.environ.get("LAZYQA_MAX_QUEUED", "64")),
+        wait_timeout=float(os.environ.get("LAZYQA_QUEUE_TIMEOUT", "30")),
+        idle_timeout=SESSION_IDLE_TIMEOUT,
+    )
+    model_calls = TokenBucket(
+        rate=float(os.environ.get("LAZYQA_MODEL_CALLS_PER_MINUTE", "60")) / 60,
+        burst=int(os.environ.get("LAZYQA_MODEL_CALL_BURST", "10")),
+        max_wait=float(os.environ.get("LAZYQA_QUEUE_TIMEOUT", "30")),
+        max_waiting=int(os.environ.get("LAZYQA_MAX_QUEUED", "64")),
+    )
+    blob_store = BlobStore(os.environ.get("LAZYQA_BLOB_DIR", "blobs"))
+    session_store = SessionStore(os.environ.get("LAZYQA_SESSION_DIR", "sessions_data"), blob_store)
+    report_store = ReportStore(os.environ.get("LAZYQA_REPORT_DIR", "reports"), blob_store)
+    model_backends.clear()
+    model_backends.update(backends_from_env())
+
+    app = FastAPI(title="Computer Use Server", version="1.0.0", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    app.include_router(bulk_cases_router)
+    return app
+
+
+_app: Optional[FastAPI] = None
+
+
+def __getattr__(name: str):
+    """`main:app` - app is created on first access, not at import"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # === API Endpoints ===
 
-@app.get("/")
+
+@router.get("/")
 async def health_check():
     """Health check"""
     return {
         "service": "Computer Use Server",
         "status": "running",
-        "model": MODEL_NAME,
+        "model": model_backends[DEFAULT_BACKEND].model if DEFAULT_BACKEND in model_backends else None,
+        "backends": {name: backend.model for name, backend in model_backends.items()},
+        "worker_id": WORKER_ID,
+        "draining": server_state["draining"],
+        "active_sessions": count_active_sessions(),
+        "admission": admission.stats(),
+        "model_calls": model_calls.stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
-@app.post("/api/v1/start", response_model=ActionResponse)
+@router.post("/api/v1/start", response_model=ActionResponse)
 async def start_session(request: StartRequest):
     """
     Start a new session - send initial prompt and screenshot to AI
     Returns actions for client to execute
     """
-    session_id = str(uuid.uuid4())
+    if server_state["draining"]:
+        # Worker is about to restart - router retries start on another worker
+        raise HTTPException(status_code=503, detail="Server is draining",
+                            headers={"Retry-After": "1"})
+    backend = request.model or DEFAULT_BACKEND
+    if backend not in model_backends:
+        raise HTTPException(status_code=400, detail=f"Unknown model backend: {backend} "
+                                                    f"(available: {', '.join(model_backends)})")
+    
+    session_id = new_session_id()
+    try:
+        await admission.admit(session_id)
+    except AdmissionRejected as e:
+        await admission.release(session_id)
+        raise too_busy(e)
+    
     logger.info(f"Starting session {session_id}: {request.prompt[:50]}...")
     
+    from google.genai import types
     try:
         # Decode screenshot
         screenshot_data = decode_image(request.screenshot)
+        screenshot_id = blob_store.put(screenshot_data)
         
         # Load system instruction from file
         system_instruction = load_system_instruction()
@@ -176,26 +545,38 @@ async def start_session(request: StartRequest):
             response_modalities=["TEXT"]
         )
         
+        session = {
+            "contents": contents,
+            "config": config,
+            "case": request.case or request.prompt[:100],
+            "backend": backend,
+            "screenshots": [screenshot_id],
+            "screen_size": png_size(screenshot_data),
+            "current_url": "about:blank",
+            "stats": new_stats(),
+            "budget": make_budget(request.budget.model_dump() if request.budget else None),
+            "created_at": datetime.utcnow().isoformat(),
+            "last_active": time.monotonic()
+        }
+        
         # Send to AI
         logger.info("Sending request to AI...")
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=contents,
-            config=config
-        )
+        response = await call_model(session)
         
         # Add AI response to conversation
         contents.append(response.candidates[0].content)
         
-        # Extract actions for client to execute
-        actions, reasoning, is_complete = extract_actions(response)
+        # Validate actions for client to execute
+        actions, reasoning, is_complete, rejected = await prepare_actions(session, response)
+        session["is_complete"] = is_complete
         
         # Store session
-        sessions[session_id] = {
-            "contents": contents,
-            "config": config,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        sessions[session_id] = session
+        publish_iteration(session_id, session, reasoning, actions, rejected, is_complete)
+        if is_complete:
+            finish_session(session_id, session, "completed")
+            await admission.release(session_id)
+        session_store.checkpoint(session_id, session)
         
         logger.info(f"Session {session_id}: Returning {len(actions)} actions to client")
         
@@ -203,15 +584,26 @@ async def start_session(request: StartRequest):
             session_id=session_id,
             actions=actions,
             reasoning=reasoning,
-            is_complete=is_complete
+            is_complete=is_complete,
+            rejected_actions=rejected,
+            budget=budget_report(session)
         )
         
+    except BudgetExceeded as e:
+        return await budget_exhausted(session_id, session, e)
+    except CircuitOpen as e:
+        await admission.release(session_id)
+        raise upstream_down(e)
+    except AdmissionRejected as e:
+        await admission.release(session_id)
+        raise too_busy(e)
     except Exception as e:
         logger.error(f"Error: {e}")
+        await admission.release(session_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/v1/continue", response_model=ActionResponse)
+@router.post("/api/v1/continue", response_model=ActionResponse)
 async def continue_session(request: ContinueRequest):
     """
     Continue existing session - client sends back execution results
@@ -222,35 +614,69 @@ async def continue_session(request: ContinueRequest):
     logger.info(f"Current URL: {request.current_url}")
     
     # Get session
-    if request.session_id not in sessions:
+    try:
+        session = get_session(request.session_id)
+    except SessionCorrupt as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
+    if session.get("is_complete"):
+        # Finished (or out of budget) - nothing more to ask the model
+        return ActionResponse(
+            session_id=request.session_id,
+            actions=[],
+            reasoning="Session already complete",
+            is_complete=True,
+            budget=budget_report(session)
+        )
     
-    session = sessions[request.session_id]
+    session["last_active"] = time.monotonic()
+    session.setdefault("stats", new_stats())
+    admission.touch(request.session_id)
+    
+    from google.genai import types
     contents = session["contents"]
-    config = session["config"]
     
     logger.info(f"Session has {len(contents)} content items")
+    # On failure the turn is rolled back so the client can safely resend it
+    turn_start = len(contents)
+    screenshots_start = len(session.setdefault("screenshots", []))
+    saved_state = {key: session.get(key) for key in ("screen_size", "current_url", "pending_results")}
+    saved_stats = copy.deepcopy(session["stats"])
+
+    def rollback_turn():
+        del contents[turn_start:]
+        del session["screenshots"][screenshots_start:]
+        session.update(saved_state)
+        # The resent turn is counted again; input already sent to the model stays charged
+        stats = session["stats"]
+        spent = {key: stats.get(key, 0) for key in ("input_bytes", "input_tokens")}
+        stats.clear()
+        stats.update(saved_stats, **spent)
     
     try:
         # Decode new screenshot
         logger.info("Decoding screenshot...")
         screenshot_data = decode_image(request.screenshot)
         logger.info(f"Screenshot decoded: {len(screenshot_data)} bytes")
+        session["screenshots"].append(blob_store.put(screenshot_data))
+        session["screen_size"] = png_size(screenshot_data)
+        session["current_url"] = request.current_url
         
-        # Build function response parts from client's execution results
-        response_parts = []
+        # Build function response parts - calls answered by the server first,
+        # then client's execution results (under the model's function name)
         logger.info("Building function response parts...")
+        response_parts = [
+            function_response_part(item["name"], request.current_url, item.get("error"))
+            for item in session.get("pending_results") or []
+        ]
         for result in request.function_results:
-            func_response = types.Part(
-                function_response={
-                    "name": result["name"],
-                    "response": {
-                        "url": request.current_url  # Current page URL after execution
-                    }
-                }
-            )
-            response_parts.append(func_response)
-            logger.info(f"  Action: {result['name']}, Success: {result.get('success', True)}")
+            name = result.get("call") or result["name"]
+            error = None if result.get("success", True) else result.get("error", "failed")
+            # Current page URL after execution
+            response_parts.append(function_response_part(name, request.current_url, error))
+            logger.info(f"  Action: {name}, Success: {result.get('success', True)}")
         
         # Add new screenshot
         logger.info("Adding screenshot to response parts...")
@@ -279,11 +705,7 @@ async def continue_session(request: ContinueRequest):
         logger.info("Sending execution results to AI...")
         logger.info(f"Total conversation parts: {len(contents)}")
         
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=contents,
-            config=config
-        )
+        response = await call_model(session)
         
         logger.info("Received AI response")
         
@@ -316,8 +738,15 @@ async def continue_session(request: ContinueRequest):
         # Add AI response to conversation
         contents.append(candidate.content)
         
-        # Extract next actions
-        actions, reasoning, is_complete = extract_actions(response)
+        # Validate next actions
+        actions, reasoning, is_complete, rejected = await prepare_actions(session, response)
+        session["is_complete"] = is_complete
+        session["last_active"] = time.monotonic()
+        publish_iteration(request.session_id, session, reasoning, actions, rejected, is_complete)
+        if is_complete:
+            finish_session(request.session_id, session, "completed")
+            await admission.release(request.session_id)
+        session_store.checkpoint(request.session_id, session)
         
         logger.info(f"Session {request.session_id}: Returning {len(actions)} actions to client")
         
@@ -325,41 +754,186 @@ async def continue_session(request: ContinueRequest):
             session_id=request.session_id,
             actions=actions,
             reasoning=reasoning,
-            is_complete=is_complete
+            is_complete=is_complete,
+            rejected_actions=rejected,
+            budget=budget_report(session)
         )
         
+    except BudgetExceeded as e:
+        return await budget_exhausted(request.session_id, session, e)
+    except CircuitOpen as e:
+        rollback_turn()
+        raise upstream_down(e)
+    except AdmissionRejected as e:
+        rollback_turn()
+        raise too_busy(e)
+    except HTTPException:
+        rollback_turn()
+        raise
     except Exception as e:
         logger.error(f"Error in continue_session: {e}", exc_info=True)
+        rollback_turn()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/v1/sessions")
+@router.get("/api/v1/sessions")
 async def list_sessions():
-    """List all sessions"""
+    """List all sessions (including stored sessions not loaded since restart)"""
+    listed = [
+        {
+            "session_id": sid,
+            "created_at": data["created_at"]
+        }
+        for sid, data in sessions.items()
+    ]
+    for meta in session_store.iter_meta():
+        if WORKER_ID and not meta["session_id"].startswith(f"{WORKER_ID}-"):
+            continue  # Listed by the worker that owns it
+        if meta["session_id"] not in sessions:
+            listed.append({
+                "session_id": meta["session_id"],
+                "created_at": meta["created_at"]
+            })
     return {
-        "total_sessions": len(sessions),
-        "sessions": [
-            {
-                "session_id": sid,
-                "created_at": data["created_at"]
-            }
-            for sid, data in sessions.items()
-        ]
+        "total_sessions": len(listed),
+        "sessions": listed
     }
 
 
-@app.delete("/api/v1/session/{session_id}")
+@router.delete("/api/v1/session/{session_id}")
 async def delete_session(session_id: str):
-    """Delete a session"""
-    if session_id in sessions:
-        del sessions[session_id]
+    """Delete a session (recorded as aborted run if it was still running)"""
+    try:
+        session = get_session(session_id)
+    except SessionCorrupt:
+        session = None  # Unrecoverable - delete it anyway
+    if session is not None and not session.get("is_complete"):
+        finish_session(session_id, session, "aborted")
+    in_memory = sessions.pop(session_id, None) is not None
+    await admission.release(session_id)
+    if session_store.delete(session_id) or in_memory:
         return {"message": "Session deleted"}
     raise HTTPException(status_code=404, detail="Session not found")
 
 
+@router.get("/api/v1/metrics")
+async def metrics():
+    """Model call metrics (attempts, retries, hedges won, circuit state, latency)"""
+    return {
+        "model_calls": {name: caller.metrics() for name, caller in model_callers.items()},
+        "admission": admission.stats(),
+        "rate_limit": model_calls.stats(),
+        "events": event_bus.stats(),
+    }
+
+
+@router.get("/api/v1/events")
+async def stream_events(session_id: Optional[str] = None):
+    """
+    Live run events as Server-Sent Events (all sessions, or one session_id)
+    Events: iteration (reasoning, actions, thumbnail, status), status (run
+    finished) and dropped (this viewer fell behind, count events were lost).
+    """
+    return StreamingResponse(event_bus.stream(session_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+REPORT_FORMATS = {
+    "csv": ("text/csv", "export_csv"),
+    "json": ("application/x-ndjson", "export_json"),
+    "html": ("text/html", "export_html"),
+}
+
+
+@router.get("/api/v1/reports")
+async def list_reports():
+    """Available report exports (for the Report Library in reports.html)"""
+    last = report_store.aggregate.last_finished_at
+    return {
+        "reports": [
+            {
+                "name": "Test Run Report",
+                "owner": "Automation",
+                "format": fmt.upper(),
+                "last_generated": last,
+                "url": f"/api/v1/reports/export?format={fmt}"
+            }
+            for fmt in REPORT_FORMATS
+        ]
+    }
+
+
+@router.get("/api/v1/reports/summary")
+async def report_summary():
+    """Pass rate, iterations per case, model latency and action counts over all runs"""
+    return report_store.summary()
+
+
+@router.get("/api/v1/reports/export")
+async def export_report(format: str = "csv", embed_thumbnails: bool = False):
+    """Stream all runs as CSV, JSON lines or HTML (with screenshot thumbnails)"""
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+    media_type, method = REPORT_FORMATS[format]
+    if format == "html":
+        body = report_store.export_html(embed_thumbnails=embed_thumbnails)
+    else:
+        body = getattr(report_store, method)()
+    filename = f"test-runs-{datetime.utcnow():%Y%m%d-%H%M%S}.{'jsonl' if format == 'json' else format}"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/api/v1/blobs/{blob_id}")
+async def get_blob(blob_id: str, thumbnail: bool = False):
+    """Get stored screenshot by blob id (thumbnail=true for a small JPEG)"""
+    try:
+        if thumbnail:
+            data = blob_store.thumbnail(blob_id)
+            if data is not None:
+                return Response(content=data, media_type="image/jpeg")
+        else:
+            mime_type = blob_store.mime_type(blob_id)
+            if mime_type is not None:
+                return Response(content=blob_store.get(blob_id), media_type=mime_type)
+    except (ValueError, FileNotFoundError):
+        pass
+    raise HTTPException(status_code=404, detail="Blob not found")
+
+
+@router.post("/api/v1/admin/drain")
+async def drain():
+    """
+    Stop accepting new sessions before a restart
+    Running sessions keep working; poll GET / until active_sessions is 0
+    """
+    server_state["draining"] = True
+    active = count_active_sessions()
+    logger.info(f"Draining: {active} active sessions left")
+    return {"draining": True, "active_sessions": active}
+
+
 # === Main ===
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    logger.info("Starting Computer Use Server...")
-    uvicorn.run(app, host="127.0.0.1", port=8080, log_level="info")
+    
+    parser = argparse.ArgumentParser(description="Computer Use Server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (sticky routing by session id)")
+    parser.add_argument("--drain-timeout", type=float, default=600.0,
+                        help="Max seconds to wait for running sessions on restart")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    if args.workers > 1:
+        from cluster import run_cluster
+        logger.info(f"Starting Computer Use Server with {args.workers} workers...")
+        run_cluster(args.workers, host=args.host, port=args.port,
+                    drain_timeout=args.drain_timeout)
+    else:
+        logger.info("Starting Computer Use Server...")
+        uvicorn.run(create_app(), host=args.host, port=args.port, log_level="info")
@@ -0,0 +1,114 @@
+// Live agent feed for Test Runs: subscribes to the Computer Use Server event
+// stream and shows one card per session with its latest iteration.
+// The section stays hidden while the server is not reachable.
+// With ?session_id=<id> only that session is shown: each card links to Test
+// Case Details this way, where the section has data-require-session.
+
+const LIVE_RUNS_SERVER_URL = 'http://127.0.0.1:8080'; // Computer Use Server (main.py)
+const LIVE_RUNS_MAX_CARDS = 20;
+
+const STATUS_STYLES = {
+  running: 'bg-blue-100 text-blue-800',
+  completed: 'bg-green-100 text-green-800',
+  failed: 'bg-red-100 text-red-800',
+  aborted: 'bg-gray-100 text-gray-800',
+};
+
+document.addEventListener('DOMContentLoaded', () => {
+  startLiveRuns();
+});
+
+/**
+ * startLiveRuns opens an EventSource on /api/v1/events. EventSource
+ * reconnects by itself, so a server restart only pauses the feed.
+ */
+function startLiveRuns() {
+  const section = document.querySelector('[data-role="live-runs"]');
+  const list = section && section.querySelector('[data-role="live-runs-list"]');
+  if (!list || typeof EventSource === 'undefined') {
+    return;
+  }
+
+  const sessionId = new URLSearchParams(window.location.search).get('session_id');
+  if (!sessionId && section.hasAttribute('data-require-session')) {
+    return;
+  }
+  const url = `${LIVE_RUNS_SERVER_URL}/api/v1/events${sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : ''}`;
+  const source = new EventSource(url);
+  const cards = new Map();
+
+  const render = (event) => {
+    section.hidden = false;
+    let card = cards.get(event.session_id);
+    if (!card) {
+      card = createLiveRunCard();
+      cards.set(event.session_id, card);
+      list.prepend(card);
+      if (cards.size > LIVE_RUNS_MAX_CARDS) {
+        const [oldestId, oldestCard] = cards.entries().next().value;
+        oldestCard.remove();
+        cards.delete(oldestId);
+      }
+    }
+    updateLiveRunCard(card, event);
+  };
+
+  source.addEventListener('iteration', (message) => render(JSON.parse(message.data)));
+  source.addEventListener('status', (message) => render(JSON.parse(message.data)));
+  source.addEventListener('dropped', (message) => {
+    console.warn(`Live runs: fell behind, ${JSON.parse(message.data).count} events skipped`);
+  });
+  source.onerror = () => {
+    console.error('Live runs: event stream interrupted, reconnecting');
+  };
+}
+
+/**
+ * createLiveRunCard builds an empty card matching the static running cards.
+ */
+function createLiveRunCard() {
+  const card = document.createElement('div');
+  card.className = 'bg-white p-4 rounded-lg shadow border border-gray-200 text-sm flex gap-4';
+  card.innerHTML = `
+    <img data-field="thumbnail" class="w-40 h-24 object-cover rounded border border-gray-200 bg-gray-50" alt="Latest screenshot" hidden>
+    <div class="flex-1 min-w-0 space-y-1">
+      <div class="flex items-center justify-between gap-2">
+        <a data-field="case" class="font-medium text-gray-800 text-[15px] truncate hover:text-blue-600"></a>
+        <span data-field="status" class="px-3 py-1 rounded text-xs font-semibold"></span>
+      </div>
+      <div data-field="meta" class="text-xs text-gray-500"></div>
+      <div data-field="reasoning" class="text-gray-600 line-clamp-2"></div>
+      <div data-field="actions" class="text-xs font-mono text-gray-700 truncate"></div>
+    </div>`;
+  return card;
+}
+
+/**
+ * updateLiveRunCard fills a card from an iteration or status event.
+ */
+function updateLiveRunCard(card, event) {
+  const field = (name) => card.querySelector(`[data-field="${name}"]`);
+  const status = event.status || 'running';
+
+  if (event.case) {
+    field('case').textContent = event.case;
+  }
+  // Test Case Details follows this one session live
+  field('case').href = `test-case-details.html?session_id=${encodeURIComponent(event.session_id)}`;
+  field('status').textContent = status.charAt(0).toUpperCase() + status.slice(1);
+  field('status').className = `px-3 py-1 rounded text-xs font-semibold ${STATUS_STYLES[status] || STATUS_STYLES.running}`;
+  field('meta').textContent = `Iteration ${event.turn || 0} · ${event.session_id}`
+    + (event.current_url ? ` · ${event.current_url}` : '');
+
+  if (event.type !== 'iteration') {
+    return;
+  }
+  field('reasoning').textContent = event.reasoning || '';
+  field('actions').textContent = (event.actions || [])
+    .map((action) => `${action.name}(${Object.values(action.args || {}).join(', ')})`)
+    .join(' → ');
+  if (event.thumbnail) {
+    field('thumbnail').src = `${LIVE_RUNS_SERVER_URL}${event.thumbnail}`;
+    field('thumbnail').hidden = false;
+  }
+}
@@ -0,0 +1,62 @@
+// Fills the Report Library table with exports generated by the Computer Use
+// Server. The static rows stay in place when the server is not reachable.
+
+const REPORTS_SERVER_URL = 'http://127.0.0.1:8080'; // Computer Use Server (main.py)
+
+document.addEventListener('DOMContentLoaded', () => {
+  loadReportLibrary();
+});
+
+/**
+ * loadReportLibrary fetches the available run report exports and renders one
+ * table row per format. Download links stream straight from the server, so
+ * large exports never pass through the page.
+ */
+async function loadReportLibrary() {
+  const tableBody = document.querySelector('[data-role="report-library"]');
+  if (!tableBody) {
+    return;
+  }
+
+  let reports;
+  try {
+    const response = await fetch(`${REPORTS_SERVER_URL}/api/v1/reports`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    reports = (await response.json()).reports || [];
+  } catch (error) {
+    console.error('Error loading report library:', error);
+    return;
+  }
+
+  tableBody.replaceChildren(...reports.map(createReportRow));
+}
+
+/**
+ * createReportRow builds a table row matching the static markup.
+ */
+function createReportRow(report) {
+  const row = document.createElement('tr');
+  const lastGenerated = report.last_generated
+    ? new Date(`${report.last_generated}Z`).toUTCString().replace(' GMT', ' UTC')
+    : 'No runs yet';
+
+  [report.name, report.owner, report.format, lastGenerated].forEach((text) => {
+    const cell = document.createElement('td');
+    cell.className = 'py-3';
+    cell.textContent = text;
+    row.appendChild(cell);
+  });
+
+  const downloadCell = document.createElement('td');
+  downloadCell.className = 'py-3 text-right';
+  const link = document.createElement('a');
+  link.href = `${REPORTS_SERVER_URL}${report.url}`;
+  link.className = 'text-blue-600 font-medium';
+  link.textContent = 'Download';
+  downloadCell.appendChild(link);
+  row.appendChild(downloadCell);
+
+  return row;
+}
@@ -3,6 +3,7 @@
  */
 
 const API_BASE_URL = 'http://localhost:5432/api'; // Adjust port if needed
+const CASES_SERVER_URL = 'http://127.0.0.1:8080'; // Computer Use Server (main.py) - bulk import/export
 
 class TestCaseAPI {
   /**
@@ -101,4 +102,72 @@ class TestCaseAPI {
       throw error;
     }
   }
+
+  /**
+   * Import test cases from a CSV (with header row) or JSON-lines file
+   * @param {number} projectId - Project ID
+   * @param {File} file - File to upload (sent as the raw request body)
+   * @param {string} format - 'csv' or 'jsonl'
+   * @param {Function} onProgress - Optional, called with the import progress while the upload runs
+   * @param {number} pollInterval - Milliseconds between progress polls
+   * @returns {Promise<Object>} Import result: inserted, failed and per-line errors
+   */
+  static async importTestCases(projectId, file, format = 'csv', onProgress = null, pollInterval = 1000) {
+    const importId = crypto.randomUUID();
+    let timer = null;
+    if (onProgress) {
+      timer = setInterval(async () => {
+        const progress = await TestCaseAPI.getImportProgress(importId).catch(() => null);
+        if (progress && timer) onProgress(progress);
+      }, pollInterval);
+    }
+
+    try {
+      const response = await fetch(`${CASES_SERVER_URL}/api/projects/${projectId}/cases/import?format=${format}&import_id=${importId}`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson',
+        },
+        body: file
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      return await response.json();
+    } catch (error) {
+      console.error('Error importing test cases:', error);
+      throw error;
+    } finally {
+      clearInterval(timer);
+      timer = null;
+    }
+  }
+
+  /**
+   * Progress of a running import
+   * @param {string} importId - import_id passed to the import request
+   * @returns {Promise<Object|null>} rows, inserted, failed and status; null if not started yet
+   */
+  static async getImportProgress(importId) {
+    const response = await fetch(`${CASES_SERVER_URL}/api/imports/${encodeURIComponent(importId)}`);
+    if (response.status === 404) {
+      return null;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * URL that downloads all test cases of a project (streamed by the server)
+   * @param {number} projectId - Project ID
+   * @param {string} format - 'csv' or 'jsonl'
+   * @returns {string} Export URL
+   */
+  static exportTestCasesUrl(projectId, format = 'csv') {
+    return `${CASES_SERVER_URL}/api/projects/${projectId}/cases/export?format=${format}`;
+  }
 }
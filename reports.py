@@ -0,0 +1,297 @@
+"""
+Test run reporting for Computer Use Server
+Every finished session becomes one run record. Records are appended to
+runs.jsonl and folded into running aggregates, so summaries never rescan
+history and exports stream the file line by line.
+
+Layout:
+    <root>/runs.jsonl       - one run record per line, append-only
+    <root>/aggregate.json   - aggregates + byte offset of runs.jsonl they cover
+
+Several worker processes may append to the same runs.jsonl; each folds the
+file from its own offset, so all of them see every run.
+"""
+
+import os
+import io
+import csv
+import json
+import html
+import base64
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterator
+
+from blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+RUN_STATUSES = ("completed", "failed", "aborted")
+
+CSV_FIELDS = ["session_id", "case", "backend", "status", "iterations", "model_calls",
+              "model_seconds", "actions", "started_at", "finished_at", "duration",
+              "first_screenshot", "last_screenshot"]
+
+# Saving aggregate.json after every run would cost more than the run record itself
+_SAVE_EVERY = 50
+
+
+class RunningStats:
+    """Count, mean, variance (Welford), min and max without keeping samples"""
+
+    def __init__(self, state: Optional[Dict[str, float]] = None):
+        state = state or {}
+        self.count = state.get("count", 0)
+        self.mean = state.get("mean", 0.0)
+        self.m2 = state.get("m2", 0.0)
+        self.min = state.get("min")
+        self.max = state.get("max")
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min, "max": self.max}
+
+    def summary(self) -> Dict[str, Any]:
+        stddev = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+        return {"count": self.count, "mean": round(self.mean, 3), "stddev": round(stddev, 3),
+                "min": self.min, "max": self.max}
+
+
+class Aggregate:
+    """Everything the summary needs, updated one run at a time"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.offset = state.get("offset", 0)
+        self.runs = state.get("runs", 0)
+        self.statuses: Dict[str, int] = state.get("statuses", {s: 0 for s in RUN_STATUSES})
+        self.iterations = RunningStats(state.get("iterations"))
+        self.model_latency = RunningStats(state.get("model_latency"))
+        self.duration = RunningStats(state.get("duration"))
+        self.action_counts: Dict[str, int] = state.get("action_counts", {})
+        # case -> {"runs", "completed", "iterations"}
+        self.cases: Dict[str, Dict[str, int]] = state.get("cases", {})
+        self.last_finished_at: Optional[str] = state.get("last_finished_at")
+
+    def fold(self, run: Dict[str, Any]):
+        self.runs += 1
+        self.statuses[run["status"]] = self.statuses.get(run["status"], 0) + 1
+        self.iterations.add(run["iterations"])
+        if run["model_calls"]:
+            self.model_latency.add(run["model_seconds"] / run["model_calls"])
+        self.duration.add(run["duration"])
+        for name, count in run["actions"].items():
+            self.action_counts[name] = self.action_counts.get(name, 0) + count
+        case = self.cases.setdefault(run["case"], {"runs": 0, "completed": 0, "iterations": 0})
+        case["runs"] += 1
+        case["completed"] += run["status"] == "completed"
+        case["iterations"] += run["iterations"]
+        self.last_finished_at = run["finished_at"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset, "runs": self.runs, "statuses": self.statuses,
+            "iterations": self.iterations.to_dict(),
+            "model_latency": self.model_latency.to_dict(),
+            "duration": self.duration.to_dict(),
+            "action_counts": self.action_counts, "cases": self.cases,
+            "last_finished_at": self.last_finished_at,
+        }
+
+
+class ReportStore:
+    def __init__(self, root: str = "reports", blob_store: Optional[BlobStore] = None):
+        self.root = root
+        self.blobs = blob_store
+        self.runs_path = os.path.join(root, "runs.jsonl")
+        self.aggregate_path = os.path.join(root, "aggregate.json")
+        os.makedirs(root, exist_ok=True)
+        # Catch-up runs on the event loop (record_run) and in export threads (summary)
+        self._lock = threading.Lock()
+        self.aggregate = self._load_aggregate()
+        self._unsaved = 0
+        self._catch_up()
+
+    def _load_aggregate(self) -> Aggregate:
+        try:
+            with open(self.aggregate_path, "r", encoding="utf-8") as f:
+                return Aggregate(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return Aggregate()
+
+    def _catch_up(self) -> int:
+        """Fold runs appended after the aggregate's offset, return how many"""
+        if not os.path.exists(self.runs_path):
+            return 0
+        folded = 0
+        with self._lock, open(self.runs_path, "rb") as f:
+            f.seek(self.aggregate.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partially written line
+                try:
+                    self.aggregate.fold(json.loads(line))
+                except (ValueError, KeyError):
+                    logger.warning("Reports: skipped unreadable run record")
+                self.aggregate.offset += len(line)
+                folded += 1
+            self._unsaved += folded
+        return folded
+
+    def _save_aggregate(self):
+        # Per-process temp file - workers share aggregate.json
+        tmp_path = f"{self.aggregate_path}.{os.getpid()}.tmp"
+        with self._lock:
+            state = self.aggregate.to_dict()
+            self._unsaved = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.aggregate_path)
+
+    def flush(self):
+        if self._unsaved:
+            self._save_aggregate()
+
+    def record_run(self, session_id: str, session: Dict[str, Any], status: str):
+        """Append finished session as a run record and fold it into the aggregate"""
+        stats = session.get("stats", {})
+        screenshots = session.get("screenshots", [])
+        started_at = session["created_at"]
+        finished_at = datetime.utcnow().isoformat()
+        run = {
+            "session_id": session_id,
+            "case": session.get("case") or "",
+            "backend": session.get("backend") or "",
+            "status": status,
+            "iterations": stats.get("turns", 0),
+            "model_calls": stats.get("model_calls", 0),
+            "model_seconds": round(stats.get("model_seconds", 0.0), 3),
+            "actions": stats.get("actions", {}),
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "duration": round((datetime.fromisoformat(finished_at)
+                               - datetime.fromisoformat(started_at)).total_seconds(), 3),
+            "first_screenshot": screenshots[0] if screenshots else None,
+            "last_screenshot": screenshots[-1] if screenshots else None,
+        }
+        line = (json.dumps(run, separators=(",", ":")) + "\n").encode("utf-8")
+        # One append-mode write per record - concurrent writers never interleave lines
+        with open(self.runs_path, "ab") as f:
+            f.write(line)
+        self._catch_up()
+        if self._unsaved >= _SAVE_EVERY:
+            self._save_aggregate()
+
+    # === Summary ===
+
+    def summary(self) -> Dict[str, Any]:
+        self._catch_up()
+        with self._lock:
+            return self._summary(self.aggregate)
+
+    @staticmethod
+    def _summary(aggregate: Aggregate) -> Dict[str, Any]:
+        completed = aggregate.statuses.get("completed", 0)
+        return {
+            "runs": aggregate.runs,
+            "statuses": dict(aggregate.statuses),
+            "pass_rate": round(completed / aggregate.runs, 4) if aggregate.runs else None,
+            "iterations": aggregate.iterations.summary(),
+            "model_latency": aggregate.model_latency.summary(),
+            "duration": aggregate.duration.summary(),
+            "action_counts": dict(aggregate.action_counts),
+            "cases": [
+                {"case": case, "runs": data["runs"],
+                 "pass_rate": round(data["completed"] / data["runs"], 4),
+                 "iterations_per_run": round(data["iterations"] / data["runs"], 2)}
+                for case, data in sorted(aggregate.cases.items())
+            ],
+            "last_finished_at": aggregate.last_finished_at,
+        }
+
+    # === Exports (generators - never load all runs) ===
+
+    def iter_runs(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.runs_path):
+            return
+        with open(self.runs_path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def iter_blob_ids(self) -> Iterator[str]:
+        """Screenshot blob ids referenced by run records (report thumbnails)"""
+        for run in self.iter_runs():
+            for key in ("first_screenshot", "last_screenshot"):
+                if run.get(key):
+                    yield run[key]
+
+    def export_json(self) -> Iterator[str]:
+        """JSON lines - one run per line"""
+        if not os.path.exists(self.runs_path):
+            return
+        with open(self.runs_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield line
+
+    def export_csv(self) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for run in self.iter_runs():
+            run["actions"] = ";".join(f"{k}={v}" for k, v in sorted(run["actions"].items()))
+            writer.writerow(run)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def _thumbnail_src(self, blob_id: Optional[str], embed: bool) -> Optional[str]:
+        if not blob_id:
+            return None
+        if not embed:
+            return f"/api/v1/blobs/{blob_id}?thumbnail=true"
+        try:
+            data = self.blobs.thumbnail(blob_id) if self.blobs else None
+        except (ValueError, FileNotFoundError):
+            data = None
+        if data is None:
+            return None
+        return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+
+    def export_html(self, embed_thumbnails: bool = False) -> Iterator[str]:
+        """HTML report - summary plus one table row per run with a last-screenshot thumbnail"""
+        summary = self.summary()
+        pass_rate = summary["pass_rate"]
+        yield ("<!DOCTYPE html><html><head><meta charset='utf-8'><title>Test Run Report</title>"
+               "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+               "td,th{border:1px solid #ddd;padding:4px 8px;font-size:13px}</style></head><body>"
+               "<h1>Test Run Report</h1>")
+        yield (f"<p>Runs: {summary['runs']} &middot; Pass rate: "
+               f"{'-' if pass_rate is None else f'{pass_rate:.1%}'} &middot; "
+               f"Iterations per run: {summary['iterations']['mean']} &middot; "
+               f"Model latency: {summary['model_latency']['mean']}s</p>")
+        yield ("<table><tr><th>Session</th><th>Case</th><th>Status</th><th>Iterations</th>"
+               "<th>Duration (s)</th><th>Actions</th><th>Finished</th><th>Screenshot</th></tr>")
+        for run in self.iter_runs():
+            src = self._thumbnail_src(run.get("last_screenshot"), embed_thumbnails)
+            image = f"<img src='{src}' loading='lazy' width='160'>" if src else ""
+            actions = ", ".join(f"{html.escape(k)}&times;{v}" for k, v in sorted(run["actions"].items()))
+            yield (f"<tr><td>{html.escape(run['session_id'])}</td><td>{html.escape(run['case'])}</td>"
+                   f"<td>{run['status']}</td><td>{run['iterations']}</td><td>{run['duration']}</td>"
+                   f"<td>{actions}</td><td>{run['finished_at']}</td><td>{image}</td></tr>")
+        yield "</table></body></html>"
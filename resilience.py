@@ -0,0 +1,225 @@
+"""
+Resilient model calls for Computer Use Server
+Wraps a blocking model call (e.g. client.models.generate_content) with:
+- retries with exponential backoff and jitter for transient errors
+- optional hedging: a second identical request after the p95 latency,
+  first successful answer wins
+- a circuit breaker that fails fast while the upstream keeps failing
+
+The wrapped call is any blocking callable, so a local mock model works too.
+Every upstream request - first try, retry or hedge - is preceded by the
+caller's before_attempt hook (rate limit token, budget charge).
+"""
+
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Awaitable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying (google.genai.errors.APIError has .code)
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Default classifier - timeouts, connection errors and 408/429/5xx API errors"""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in TRANSIENT_STATUS_CODES:
+        return True
+    # httpx transport errors (used by google-genai) without importing httpx here
+    return type(error).__module__.startswith("httpx") and "Error" in type(error).__name__
+
+
+class CircuitOpen(Exception):
+    """Upstream is unhealthy - call rejected without trying"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = max(1, int(retry_after + 0.5))
+
+
+class CircuitBreaker:
+    """
+    closed    - calls pass; failure_threshold transient failures in a row open it
+    open      - calls rejected for reset_timeout seconds
+    half-open - one probe call passes; success closes, failure opens again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half-open" and self.probing):
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpen(max(remaining, 1.0))
+        if state == "half-open":
+            self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probing:
+                logger.warning(f"Model circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class LatencyTracker:
+    """Latency percentiles over the most recent successful calls"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    def __init__(self, retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 hedge: bool = False, hedge_quantile: float = 0.95, hedge_min_delay: float = 2.0,
+                 hedge_min_samples: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 classify: Callable[[BaseException], bool] = is_transient):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.classify = classify
+        self.latency = LatencyTracker()
+        self.counters: Dict[str, int] = {
+            "calls": 0, "attempts": 0, "retries": 0, "hedges_sent": 0,
+            "hedges_won": 0, "failures": 0, "circuit_rejections": 0,
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None while there is too little data"""
+        if not self.hedge or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.quantile(self.hedge_quantile))
+
+    async def _attempt(self, fn: Callable, args, kwargs,
+                       before_attempt: Optional[Callable[[], Awaitable]] = None):
+        """One attempt, possibly hedged - returns first successful result"""
+        started = time.monotonic()
+        primary = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        pending = {primary}
+        delay = self.hedge_delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                try:
+                    if before_attempt is not None:
+                        await before_attempt()
+                except Exception as e:
+                    # A hedge is optional - no token or budget left, keep waiting instead
+                    logger.info(f"Hedge request skipped: {e}")
+                else:
+                    self.counters["hedges_sent"] += 1
+                    logger.info(f"Model call slower than {delay:.1f}s, sending hedge request")
+                    pending.add(asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs)))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        self.counters["hedges_won"] += 1
+                    self.latency.record(time.monotonic() - started)
+                    # The other thread cannot be interrupted - its result is dropped
+                    for other in pending:
+                        other.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def call(self, fn: Callable, *args,
+                   before_attempt: Optional[Callable[[], Awaitable]] = None, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs) in a thread with retries, hedging and circuit breaking
+        before_attempt is awaited before every request sent upstream; its errors
+        end the call (a skipped hedge excepted).
+        """
+        self.counters["calls"] += 1
+        for attempt in range(self.retries + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpen:
+                self.counters["circuit_rejections"] += 1
+                raise
+            if before_attempt is not None:
+                try:
+                    await before_attempt()
+                except BaseException:
+                    self.breaker.probing = False
+                    raise
+
+            self.counters["attempts"] += 1
+            try:
+                result = await self._attempt(fn, args, kwargs, before_attempt)
+            except asyncio.CancelledError:
+                self.breaker.probing = False
+                raise
+            except Exception as e:
+                if not self.classify(e):
+                    # Bad request etc. - upstream answered, so it is healthy
+                    self.breaker.record_success()
+                    self.counters["failures"] += 1
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                self.counters["retries"] += 1
+                logger.warning(f"Model call failed ({e}), retry {attempt + 1}/{self.retries} "
+                               f"in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        p50 = self.latency.quantile(0.5)
+        p95 = self.latency.quantile(0.95)
+        return {
+            **self.counters,
+            "circuit": self.breaker.state,
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+            "hedge_delay": self.hedge_delay(),
+        }
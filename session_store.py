@@ -0,0 +1,209 @@
+"""
+Session persistence for Computer Use Server
+Checkpoints session history to disk after each turn so sessions survive restarts.
+
+Layout (one directory per session):
+    <root>/<session_id>/meta.json      - config and metadata, rewritten each turn
+    <root>/<session_id>/history.jsonl  - one types.Content per line, append-only
+
+Screenshots are kept in the shared BlobStore and referenced by blob id.
+
+Sessions are loaded lazily on first access, so startup does not read anything.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+from typing import Optional, Dict, Any, Iterator, TYPE_CHECKING
+
+from blob_store import BlobStore
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Session keys that are rebuilt on load instead of written to meta.json
+_NOT_PERSISTED = {"contents", "config", "persisted_contents", "last_active"}
+
+
+class SessionCorrupt(Exception):
+    """Stored session whose committed history cannot be read (file left as is)"""
+
+
+class SessionStore:
+    def __init__(self, root: str = "sessions_data", blob_store: Optional[BlobStore] = None):
+        self.root = root
+        self.blobs = blob_store or BlobStore(os.path.join(root, "blobs"))
+        os.makedirs(root, exist_ok=True)
+
+    def _session_dir(self, session_id: str) -> str:
+        # Session ids come from clients - never let them escape root
+        if not session_id or os.sep in session_id or "/" in session_id or session_id.startswith("."):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.root, session_id)
+
+    # === Serialization ===
+
+    def _dump_content(self, content: "types.Content") -> Dict[str, Any]:
+        """Content -> JSON dict, with image bytes replaced by blob hashes"""
+        parts = []
+        for part in content.parts or []:
+            inline = part.inline_data
+            if inline is not None and inline.data:
+                data = part.model_dump(mode="json", exclude_none=True,
+                                       exclude={"inline_data": {"data"}})
+                data["inline_data"]["blob"] = self.blobs.put(inline.data)
+            else:
+                data = part.model_dump(mode="json", exclude_none=True)
+            parts.append(data)
+        dumped = {"parts": parts}
+        if content.role:
+            dumped["role"] = content.role
+        return dumped
+
+    def _load_content(self, data: Dict[str, Any]) -> "types.Content":
+        from google.genai import types
+        for part in data.get("parts", []):
+            inline = part.get("inline_data")
+            if inline and "blob" in inline:
+                inline["data"] = self.blobs.get(inline.pop("blob"))
+        return types.Content.model_validate(data)
+
+    # === Public API ===
+
+    def checkpoint(self, session_id: str, session: Dict[str, Any]):
+        """Persist session - appends only contents added since the last checkpoint"""
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+
+        contents = session["contents"]
+        persisted = session.get("persisted_contents", 0)
+        if len(contents) > persisted:
+            lines = [
+                json.dumps(self._dump_content(content), separators=(",", ":"))
+                for content in contents[persisted:]
+            ]
+            with open(os.path.join(session_dir, "history.jsonl"), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            session["persisted_contents"] = len(contents)
+
+        meta = {k: v for k, v in session.items() if k not in _NOT_PERSISTED}
+        meta["session_id"] = session_id
+        meta["config"] = session["config"].model_dump(mode="json", exclude_none=True)
+        meta["num_contents"] = session["persisted_contents"]
+        meta_path = os.path.join(session_dir, "meta.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild session from disk, None if it was never stored
+        Raises SessionCorrupt if committed history items are missing or unreadable.
+        """
+        try:
+            session_dir = self._session_dir(session_id)
+        except ValueError:
+            return None
+        meta = self.read_meta(session_id)
+        if meta is None:
+            return None
+
+        contents = []
+        committed = 0  # Byte offset after the last committed line
+        history_path = os.path.join(session_dir, "history.jsonl")
+        if os.path.exists(history_path):
+            with open(history_path, "rb") as f:
+                for line in f:
+                    if len(contents) == meta["num_contents"]:
+                        # Turn appended after the last meta update - not committed
+                        break
+                    if not line.endswith(b"\n"):
+                        break  # Torn write - missing items are reported below
+                    try:
+                        contents.append(self._load_content(json.loads(line)))
+                    except (ValueError, OSError) as e:
+                        raise SessionCorrupt(f"Session {session_id}: history item "
+                                             f"{len(contents)} unreadable: {e}")
+                    committed += len(line)
+        if len(contents) != meta["num_contents"]:
+            # Committed history is gone - never continue with part of a conversation
+            raise SessionCorrupt(f"Session {session_id}: history has {len(contents)} of "
+                                 f"{meta['num_contents']} items")
+        if os.path.exists(history_path) and committed != os.path.getsize(history_path):
+            # Cut the uncommitted tail now, so the next checkpoint appends after
+            # the restored items - even if the process restarts before it
+            os.truncate(history_path, committed)
+
+        session = {k: v for k, v in meta.items() if k not in ("session_id", "num_contents")}
+        from google.genai import types
+        session["config"] = types.GenerateContentConfig.model_validate(meta["config"])
+        session["contents"] = contents
+        session["persisted_contents"] = len(contents)
+        logger.info(f"Session {session_id}: restored {len(contents)} content items from disk")
+        return session
+
+    def read_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._session_dir(session_id), "meta.json"),
+                      "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def iter_meta(self) -> Iterator[Dict[str, Any]]:
+        """Metadata of every stored session (reads meta.json only)"""
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                meta = self.read_meta(entry.name)
+                if meta is not None:
+                    yield meta
+
+    def iter_blob_ids(self) -> Iterator[str]:
+        """Screenshot blob ids referenced by stored sessions (meta and history)"""
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            meta = self.read_meta(entry.name)
+            if meta is not None:
+                yield from meta.get("screenshots", [])
+            try:
+                with open(os.path.join(entry.path, "history.jsonl"), "rb") as f:
+                    for line in f:
+                        try:
+                            parts = json.loads(line).get("parts", [])
+                        except ValueError:
+                            continue
+                        for part in parts:
+                            blob_id = (part.get("inline_data") or {}).get("blob")
+                            if blob_id:
+                                yield blob_id
+            except FileNotFoundError:
+                continue
+
+    def delete(self, session_id: str) -> bool:
+        try:
+            session_dir = self._session_dir(session_id)
+        except ValueError:
+            return False
+        if not os.path.isdir(session_dir):
+            return False
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return True
+
+    def prune(self, max_age: float) -> int:
+        """Delete sessions without a checkpoint for max_age seconds"""
+        deleted = 0
+        cutoff = time.time() - max_age
+        for entry in os.scandir(self.root):
+            meta_path = os.path.join(entry.path, "meta.json")
+            try:
+                if entry.is_dir() and os.stat(meta_path).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        return deleted
@@ -0,0 +1,77 @@
+"""
+Validation of model function calls against the action registry:
+remaps, argument coercion, pixel -> 0-999 grid and rejected calls
+
+Run: python -m pytest tests
+"""
+
+import struct
+
+import pytest
+
+from actions import (ActionError, NORMALIZED_MAX, normalize_point, validate_action,
+                     validate_actions, png_size)
+
+
+def test_normalized_coordinates_pass_through():
+    action = validate_action({"name": "click_at", "args": {"x": 500, "y": 250.4}})
+    assert action == {"name": "click_at", "args": {"x": 500, "y": 250}, "call": "click_at"}
+
+
+def test_pixel_coordinates_are_mapped_to_grid():
+    assert normalize_point(1920, 540, (1920, 1080)) == (NORMALIZED_MAX, 500)
+    assert normalize_point(1280, 400, (2560, 1440)) == (500, 277)
+    # Without the screenshot size pixels can only be clamped
+    assert normalize_point(1500, 20, None) == (NORMALIZED_MAX, 20)
+    assert normalize_point(-5, 1000, None) == (0, NORMALIZED_MAX)
+
+    action = validate_action({"name": "drag_and_drop", "args": {
+        "x": 1600, "y": 900, "destination_x": 2400, "destination_y": 1350}}, (3200, 1800))
+    assert action["args"] == {"x": 500, "y": 500, "destination_x": 750, "destination_y": 750}
+
+
+def test_remaps_keep_the_model_function_name():
+    action = validate_action({"name": "key_combination", "args": {"keys": "Control+Shift+ArrowLeft"}})
+    assert action == {"name": "hotkey", "args": {"keys": ["ctrl", "shift", "left"]},
+                      "call": "key_combination"}
+
+    action = validate_action({"name": "scroll_document", "args": {"direction": "UP"}})
+    assert action["name"] == "scroll"
+    assert action["args"] == {"direction": "up", "amount": 10}
+
+    assert validate_action({"name": "click", "args": {"x": 1, "y": 2}})["name"] == "click_at"
+
+
+def test_defaults_and_coercion():
+    action = validate_action({"name": "type_text_at", "args": {
+        "text": 42, "press_enter": "yes"}})
+    assert action["args"] == {"text": "42", "press_enter": True, "clear_before_typing": True}
+
+
+@pytest.mark.parametrize("action, message", [
+    ({"name": "teleport", "args": {}}, "Unsupported action: teleport"),
+    ({"name": "click_at", "args": {"x": 5}}, "missing argument y"),
+    ({"name": "click_at", "args": {"x": "left", "y": 5}}, "invalid x"),
+    ({"name": "scroll", "args": {"direction": "sideways"}}, "direction must be one of"),
+])
+def test_invalid_calls_raise(action, message):
+    with pytest.raises(ActionError, match=message):
+        validate_action(action)
+
+
+def test_validate_actions_splits_client_local_and_rejected():
+    result = validate_actions([
+        {"name": "open_web_browser", "args": {}},
+        {"name": "navigate", "args": {"url": "https://example.com"}},
+        {"name": "navigate", "args": {}},
+    ])
+    assert [a["name"] for a in result.client] == ["navigate"]
+    assert [a["name"] for a in result.local] == ["open_web_browser"]
+    assert result.rejected == [{"name": "navigate", "args": {},
+                                "error": "navigate: missing argument url"}]
+
+
+def test_png_size():
+    header = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + struct.pack(">II", 1280, 800)
+    assert png_size(header) == (1280, 800)
+    assert png_size(b"GIF89a" + b"\x00" * 30) is None
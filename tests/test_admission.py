@@ -0,0 +1,99 @@
+"""
+Session slots, bounded wait queue and model call rate limit
+(AdmissionRejected becomes 429 + Retry-After in main.py)
+
+Run: python -m pytest tests
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def test_sessions_over_cap_wait_for_a_release():
+    async def scenario():
+        admission = AdmissionController(max_active=1, wait_timeout=5)
+        await admission.admit("s1")
+        waiter = asyncio.create_task(admission.admit("s2"))
+        await asyncio.sleep(0.05)
+        assert admission.stats()["waiting"] == 1
+
+        await admission.release("s1")
+        await asyncio.wait_for(waiter, 1)
+        return admission.stats()
+
+    assert asyncio.run(scenario()) == {"active": 1, "max_active": 1,
+                                       "waiting": 0, "max_waiting": 64}
+
+
+def test_queue_timeout_is_rejected_with_retry_after():
+    async def scenario():
+        admission = AdmissionController(max_active=1, wait_timeout=0.1)
+        await admission.admit("s1")
+        with pytest.raises(AdmissionRejected, match="No session slot") as rejected:
+            await admission.admit("s2")
+        assert rejected.value.retry_after == 1
+        assert admission.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_at_once():
+    async def scenario():
+        admission = AdmissionController(max_active=1, max_waiting=1, wait_timeout=5)
+        await admission.admit("s1")
+        waiter = asyncio.create_task(admission.admit("s2"))
+        await asyncio.sleep(0.05)
+
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected, match="Too many sessions waiting"):
+            await admission.admit("s3")
+        assert time.monotonic() - started < 0.1
+        waiter.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_idle_sessions_free_their_slot():
+    async def scenario():
+        admission = AdmissionController(max_active=1, wait_timeout=0.1, idle_timeout=0.05)
+        await admission.admit("s1")
+        await asyncio.sleep(0.1)
+        await admission.admit("s2")
+        assert list(admission.active) == ["s2"]
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_burst_then_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=2, max_wait=1)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two calls from the burst, two more at 20/s
+    assert 0.08 < asyncio.run(scenario()) < 0.5
+
+
+def test_token_bucket_rejects_long_waits_and_long_queues():
+    async def scenario():
+        bucket = TokenBucket(rate=1, burst=1, max_wait=2, max_waiting=1)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())  # Waits ~1s
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected, match="Too many model calls waiting"):
+            await bucket.acquire()
+        waiter.cancel()
+
+        slow = TokenBucket(rate=0.1, burst=1, max_wait=2)
+        await slow.acquire()
+        with pytest.raises(AdmissionRejected, match="Model call rate limit") as rejected:
+            await slow.acquire()
+        assert rejected.value.retry_after == 10
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+"""
+BlobStore deduplication, compression and retention
+
+Run: python -m pytest tests
+"""
+
+import os
+import time
+
+import pytest
+
+from blob_store import BlobStore, blob_id_for
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def age(blobs: BlobStore, blob_id: str, seconds: float):
+    path = blobs._find(blob_id)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_identical_data_is_stored_once(blobs):
+    first = blobs.put(PNG)
+    assert blobs.put(PNG) == first == blob_id_for(PNG)
+    assert len(list(blobs.iter_blobs())) == 1
+    assert blobs.get(first) == PNG
+    assert blobs.mime_type(first) == "image/png"
+
+
+def test_non_images_are_compressed(blobs):
+    data = b"log line\n" * 1000
+    blob_id = blobs.put(data)
+    assert blobs._find(blob_id).endswith(".z")
+    assert os.path.getsize(blobs._find(blob_id)) < len(data)
+    assert blobs.get(blob_id) == data
+
+
+def test_invalid_ids_are_rejected_before_touching_the_disk(blobs):
+    for blob_id in ("../../etc/passwd", "a" * 63, "G" * 64):
+        with pytest.raises(ValueError):
+            blobs.get(blob_id)
+        with pytest.raises(ValueError):
+            blobs.thumbnail(blob_id)
+
+
+def test_prune_keeps_referenced_and_recent_blobs(blobs):
+    old_kept = blobs.put(PNG)
+    old_unused = blobs.put(PNG + b"1")
+    recent = blobs.put(PNG + b"2")
+    age(blobs, old_kept, 3600)
+    age(blobs, old_unused, 3600)
+
+    assert blobs.prune(max_age=60, keep={old_kept}) == 1
+    assert blobs.exists(old_kept) and blobs.exists(recent)
+    assert not blobs.exists(old_unused)
+
+
+def test_prune_to_size_drops_least_recently_used(blobs):
+    older = blobs.put(PNG + b"a")
+    newer = blobs.put(PNG + b"b")
+    age(blobs, older, 100)
+
+    blobs.prune(max_bytes=len(PNG) + 1)
+    assert blobs.exists(newer)
+    assert not blobs.exists(older)
@@ -0,0 +1,108 @@
+"""
+Streaming CSV / JSON-lines parser and row validation of the bulk importer
+
+Run: python -m pytest tests
+"""
+
+import time
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from bulk_cases import (StreamParser, RowError, validate_case,
+                        MAX_RECORD_CHARS, MAX_RECORD_LINES)
+
+
+def parse(fmt: str, text: str, chunk: int = 7) -> list:
+    """Feed text in small chunks (splits lines and quoted fields) - (line, row) list"""
+    parser = StreamParser(fmt)
+    rows = []
+    for i in range(0, len(text), chunk):
+        rows.extend(parser.feed(text[i:i + chunk]))
+    rows.extend(parser.feed("", final=True))
+    return rows
+
+
+def errors(rows: list) -> list:
+    return [(line, str(row)) for line, row in rows if isinstance(row, RowError)]
+
+
+def test_csv_rows_with_header():
+    rows = parse("csv", "name,description\r\nLogin,Log in\r\nLogout,Log out\r\n")
+    assert rows == [(2, {"name": "Login", "description": "Log in"}),
+                    (3, {"name": "Logout", "description": "Log out"})]
+
+
+def test_csv_multiline_quoted_field():
+    text = 'name,description\nA,"first line\nsecond, with ""quotes""\nthird"\nB,plain\n'
+    rows = parse("csv", text, chunk=3)
+    assert rows == [
+        (2, {"name": "A", "description": 'first line\nsecond, with "quotes"\nthird'}),
+        (5, {"name": "B", "description": "plain"}),
+    ]
+
+
+def test_csv_column_count_mismatch():
+    rows = parse("csv", "name,description\nA,B,C\nD,E\n")
+    assert errors(rows) == [(2, "expected 2 columns, got 3")]
+    assert rows[-1] == (3, {"name": "D", "description": "E"})
+
+
+def test_csv_unterminated_quote_at_end():
+    rows = parse("csv", 'name,description\nA,"never closed\nB,x\n')
+    assert errors(rows) == [(2, "unterminated quoted field")]
+
+
+def test_csv_stray_quote_resyncs_in_linear_time():
+    lines = ["name,description", 'broken,"stray quote']
+    lines += [f"case {i},description {i} " + "x" * 60 for i in range(40000)]
+    text = "\n".join(lines) + "\n"
+
+    started = time.monotonic()
+    rows = parse("csv", text, chunk=64 * 1024)
+    assert time.monotonic() - started < 5
+
+    assert errors(rows)[0][0] == 2
+    assert "unterminated quoted field" in errors(rows)[0][1]
+    parsed = [row for _, row in rows if not isinstance(row, RowError)]
+    # Only the lines swallowed by the bad record are lost
+    assert len(parsed) >= 40000 - MAX_RECORD_LINES
+    assert parsed[-1]["name"] == "case 39999"
+
+
+def test_long_line_without_newline_is_dropped():
+    parser = StreamParser("jsonl")
+    rows = list(parser.feed('{"description": "ok"}\n'))
+    for _ in range(5):
+        rows.extend(parser.feed("y" * (MAX_RECORD_CHARS // 2)))
+        assert len(parser.buffer) <= MAX_RECORD_CHARS
+    rows.extend(parser.feed('\n{"description": "after"}\n', final=True))
+
+    assert errors(rows) == [(2, f"line longer than {MAX_RECORD_CHARS} characters")]
+    assert [row for _, row in rows if not isinstance(row, RowError)] == [
+        {"description": "ok"}, {"description": "after"}]
+
+
+def test_jsonl_rows_and_errors():
+    text = "\n".join([json.dumps({"description": "a"}), "not json", "[1]", "",
+                      json.dumps({"description": "b"})])
+    rows = parse("jsonl", text)
+    assert rows[0] == (1, {"description": "a"})
+    assert [line for line, _ in errors(rows)] == [2, 3]
+    assert rows[-1] == (5, {"description": "b"})
+
+
+def test_validate_case():
+    record = validate_case({"description": " Check login ", "is_active": "no",
+                            "metadata": '{"tags": ["smoke"]}'})
+    assert record == ("Check login", "Check login", "", False, "127.0.0.1",
+                      '{"tags": ["smoke"]}')
+
+    for row, message in [({}, "description is required"),
+                         ({"description": "x", "metadata": "{"}, "metadata: invalid JSON"),
+                         ({"description": "x", "metadata": "[1]"}, "metadata must be an object"),
+                         ({"description": "x", "is_active": "maybe"}, "is_active")]:
+        with pytest.raises(RowError, match=message):
+            validate_case(row)
@@ -0,0 +1,146 @@
+"""
+Run records, Welford aggregates and catch-up between processes
+
+Run: python -m pytest tests
+"""
+
+import os
+import json
+import random
+import statistics
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from reports import ReportStore, RunningStats, Aggregate
+
+
+def make_session(case: str = "Login", turns: int = 3, actions: dict = None) -> dict:
+    return {
+        "case": case, "backend": "mock",
+        "created_at": (datetime.utcnow() - timedelta(seconds=30)).isoformat(),
+        "screenshots": ["a" * 64, "b" * 64],
+        "stats": {"turns": turns, "model_calls": turns, "model_seconds": turns * 0.5,
+                  "actions": actions or {"click_at": 2}},
+    }
+
+
+@pytest.fixture
+def reports_dir(tmp_path):
+    return str(tmp_path / "reports")
+
+
+def test_running_stats_match_statistics_module():
+    values = [random.uniform(0, 100) for _ in range(500)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    summary = stats.summary()
+    assert summary["count"] == 500
+    assert summary["mean"] == pytest.approx(statistics.mean(values), abs=1e-3)
+    assert summary["stddev"] == pytest.approx(statistics.stdev(values), abs=1e-3)
+    assert (summary["min"], summary["max"]) == (min(values), max(values))
+
+
+def test_running_stats_survive_serialization():
+    stats = RunningStats()
+    for value in (1, 2, 3):
+        stats.add(value)
+    restored = RunningStats(json.loads(json.dumps(stats.to_dict())))
+    restored.add(4)
+    assert restored.summary()["mean"] == 2.5
+    assert restored.summary()["stddev"] == pytest.approx(statistics.stdev([1, 2, 3, 4]), abs=1e-3)
+
+
+def test_record_run_and_summary(reports_dir):
+    store = ReportStore(reports_dir)
+    store.record_run("s1", make_session(turns=2), "completed")
+    store.record_run("s2", make_session(turns=4, actions={"navigate": 1}), "failed")
+    store.record_run("s3", make_session(case="Logout"), "completed")
+
+    summary = store.summary()
+    assert summary["runs"] == 3
+    assert summary["statuses"]["completed"] == 2
+    assert summary["pass_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert summary["iterations"]["mean"] == 3
+    assert summary["action_counts"] == {"click_at": 4, "navigate": 1}
+    assert [case["case"] for case in summary["cases"]] == ["Login", "Logout"]
+
+
+def test_other_processes_runs_are_caught_up(reports_dir):
+    worker_a = ReportStore(reports_dir)
+    worker_b = ReportStore(reports_dir)
+    worker_a.record_run("s1", make_session(), "completed")
+    worker_b.record_run("s2", make_session(), "failed")
+
+    assert worker_a.summary()["runs"] == worker_b.summary()["runs"] == 2
+
+    worker_a.flush()
+    restarted = ReportStore(reports_dir)
+    assert restarted.summary()["runs"] == 2
+
+
+def test_aggregate_resumes_from_saved_offset(reports_dir):
+    store = ReportStore(reports_dir)
+    store.record_run("s1", make_session(), "completed")
+    store.flush()
+    store.record_run("s2", make_session(), "completed")  # Not saved in aggregate.json
+
+    restarted = ReportStore(reports_dir)
+    assert restarted.summary()["runs"] == 2
+    assert restarted.aggregate.offset == os.path.getsize(restarted.runs_path)
+
+
+def test_concurrent_summary_and_record_count_each_run_once(reports_dir):
+    store = ReportStore(reports_dir)
+    stop = threading.Event()
+
+    def read_summaries():
+        while not stop.is_set():
+            store.summary()
+
+    readers = [threading.Thread(target=read_summaries) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(200):
+            store.record_run(f"s{i}", make_session(), "completed")
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    assert store.summary()["runs"] == 200
+    assert ReportStore(reports_dir).summary()["runs"] == 200
+
+
+def test_partial_line_is_not_folded(reports_dir):
+    store = ReportStore(reports_dir)
+    store.record_run("s1", make_session(), "completed")
+    with open(store.runs_path, "a", encoding="utf-8") as f:
+        f.write('{"session_id": "s2", "status": "compl')
+
+    assert store.summary()["runs"] == 1
+    assert len(list(store.iter_runs())) == 1
+
+
+def test_exports(reports_dir):
+    store = ReportStore(reports_dir)
+    store.record_run("s1", make_session(case="<b>Login</b>"), "completed")
+
+    csv_text = "".join(store.export_csv())
+    assert csv_text.splitlines()[0].startswith("session_id,case,backend,status")
+    assert "click_at=2" in csv_text
+    assert json.loads("".join(store.export_json()))["session_id"] == "s1"
+    html_text = "".join(store.export_html())
+    assert "&lt;b&gt;Login&lt;/b&gt;" in html_text
+    assert f"/api/v1/blobs/{'b' * 64}?thumbnail=true" in html_text
+    assert set(store.iter_blob_ids()) == {"a" * 64, "b" * 64}
+
+
+def test_empty_aggregate_summary():
+    summary = ReportStore._summary(Aggregate())
+    assert summary["runs"] == 0
+    assert summary["pass_rate"] is None
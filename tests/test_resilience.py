@@ -0,0 +1,181 @@
+"""
+ResilientCaller against the local mock model (no network)
+FlakyBackend wraps MockBackend and fails or stalls its first calls, so the
+retry, hedge and circuit breaker paths run exactly as with a real model.
+
+Run: python -m pytest tests
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from backends import MockBackend
+from resilience import ResilientCaller, CircuitBreaker, CircuitOpen
+
+SCRIPT = [{"text": "done", "calls": [{"name": "navigate", "args": {"url": "https://example.com"}}]}]
+
+
+class UpstreamError(Exception):
+    """Stand-in for google.genai.errors.APIError (classified by .code)"""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FlakyBackend:
+    """MockBackend whose first `failures` calls raise and first `slow` calls stall"""
+
+    def __init__(self, failures: int = 0, error: Exception = None, slow: int = 0,
+                 stall: float = 0.0):
+        self.backend = MockBackend(SCRIPT)
+        self.failures = failures
+        self.error = error or UpstreamError(503)
+        self.slow = slow
+        self.stall = stall
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, contents, config):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call <= self.failures:
+            raise self.error
+        if call <= self.slow:
+            time.sleep(self.stall)
+        return self.backend.generate(contents, config)
+
+
+def make_caller(**kwargs) -> ResilientCaller:
+    kwargs.setdefault("backoff_base", 0.0)  # No sleeping between retries
+    return ResilientCaller(**kwargs)
+
+
+def text_of(response) -> str:
+    return response.candidates[0].content.parts[0].text
+
+
+def test_transient_errors_are_retried():
+    flaky = FlakyBackend(failures=2)
+    caller = make_caller(retries=3)
+
+    response = asyncio.run(caller.call(flaky.generate, [], None))
+
+    assert text_of(response) == "done"
+    assert flaky.calls == 3
+    assert caller.counters["retries"] == 2
+    assert caller.counters["attempts"] == 3
+    assert caller.breaker.state == "closed"
+
+
+def test_gives_up_after_retries():
+    flaky = FlakyBackend(failures=10)
+    caller = make_caller(retries=2)
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(caller.call(flaky.generate, [], None))
+    assert flaky.calls == 3
+    assert caller.counters["failures"] == 1
+
+
+def test_bad_request_is_not_retried():
+    flaky = FlakyBackend(failures=1, error=UpstreamError(400))
+    caller = make_caller(retries=3)
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(caller.call(flaky.generate, [], None))
+    assert flaky.calls == 1
+    assert caller.breaker.failures == 0
+
+
+def test_circuit_opens_then_recovers_through_probe():
+    flaky = FlakyBackend(failures=3)
+    caller = make_caller(retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            asyncio.run(caller.call(flaky.generate, [], None))
+    assert caller.breaker.state == "open"
+
+    with pytest.raises(CircuitOpen):
+        asyncio.run(caller.call(flaky.generate, [], None))
+    assert flaky.calls == 3  # Rejected without calling the model
+
+    time.sleep(0.25)
+    assert caller.breaker.state == "half-open"
+    assert text_of(asyncio.run(caller.call(flaky.generate, [], None))) == "done"
+    assert caller.breaker.state == "closed"
+
+
+def test_hedge_wins_when_primary_stalls():
+    flaky = FlakyBackend(slow=1, stall=1.0)
+    caller = make_caller(hedge=True, hedge_min_samples=1, hedge_min_delay=0.05)
+    caller.latency.record(0.01)
+
+    async def timed_call():
+        started = time.monotonic()
+        response = await caller.call(flaky.generate, [], None)
+        return response, time.monotonic() - started
+
+    # asyncio.run() itself waits for the stalled thread - time the call only
+    response, seconds = asyncio.run(timed_call())
+
+    assert text_of(response) == "done"
+    assert seconds < 0.9
+    assert caller.counters["hedges_sent"] == 1
+    assert caller.counters["hedges_won"] == 1
+
+
+def test_before_attempt_runs_for_every_upstream_request():
+    flaky = FlakyBackend(failures=1, slow=2, stall=0.5)
+    caller = make_caller(retries=3, hedge=True, hedge_min_samples=1, hedge_min_delay=0.05)
+    caller.latency.record(0.01)
+    attempts = []
+
+    async def before_attempt():
+        attempts.append(flaky.calls)
+
+    asyncio.run(caller.call(flaky.generate, [], None, before_attempt=before_attempt))
+
+    # Failed first try, stalled retry, hedge for the retry
+    assert len(attempts) == flaky.calls == 3
+
+
+def test_before_attempt_error_stops_retries():
+    flaky = FlakyBackend(failures=10)
+    caller = make_caller(retries=5)
+    tokens = [1, 1]
+
+    async def before_attempt():
+        if not tokens:
+            raise RuntimeError("no tokens left")
+        tokens.pop()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(caller.call(flaky.generate, [], None, before_attempt=before_attempt))
+    assert flaky.calls == 2
+    assert not caller.breaker.probing
+
+
+def test_skipped_hedge_keeps_waiting_for_primary():
+    flaky = FlakyBackend(slow=1, stall=0.3)
+    caller = make_caller(hedge=True, hedge_min_samples=1, hedge_min_delay=0.05)
+    caller.latency.record(0.01)
+    attempts = []
+
+    async def before_attempt():
+        if attempts:
+            raise RuntimeError("rate limited")
+        attempts.append(1)
+
+    response = asyncio.run(caller.call(flaky.generate, [], None, before_attempt=before_attempt))
+
+    assert text_of(response) == "done"
+    assert flaky.calls == 1
+    assert caller.counters["hedges_sent"] == 0
@@ -0,0 +1,127 @@
+"""
+SessionStore checkpoint / restore, including recovery after a crash
+between writing history.jsonl and meta.json
+
+Run: python -m pytest tests
+"""
+
+import os
+import json
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from google.genai import types
+
+from blob_store import BlobStore
+from session_store import SessionStore, SessionCorrupt
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def make_session(items: int = 3) -> dict:
+    contents = [types.Content(role="user", parts=[
+        types.Part(text="open the login page"),
+        types.Part(inline_data={"mime_type": "image/png", "data": PNG}),
+    ])]
+    for i in range(1, items):
+        contents.append(types.Content(role="model" if i % 2 else "user",
+                                      parts=[types.Part(text=f"turn {i}")]))
+    return {"contents": contents, "config": types.GenerateContentConfig(temperature=1.0),
+            "case": "login", "created_at": "2025-01-01T00:00:00"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions"), BlobStore(str(tmp_path / "blobs")))
+
+
+def history_path(store: SessionStore, session_id: str) -> str:
+    return os.path.join(store.root, session_id, "history.jsonl")
+
+
+def test_checkpoint_and_load_round_trip(store):
+    session = make_session()
+    store.checkpoint("s1", session)
+
+    restored = store.load("s1")
+
+    assert restored["case"] == "login"
+    assert len(restored["contents"]) == 3
+    assert restored["contents"][0].parts[1].inline_data.data == PNG
+    assert restored["persisted_contents"] == 3
+
+
+def test_checkpoint_appends_only_new_items(store):
+    session = make_session()
+    store.checkpoint("s1", session)
+    session["contents"].append(types.Content(role="model", parts=[types.Part(text="next")]))
+    store.checkpoint("s1", session)
+
+    with open(history_path(store, "s1"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
+    assert len(store.load("s1")["contents"]) == 4
+
+
+def test_uncommitted_tail_is_truncated_and_stays_truncated(store):
+    store.checkpoint("s1", make_session())
+    committed_size = os.path.getsize(history_path(store, "s1"))
+    # Crash after appending a turn, before meta.json was rewritten - last line torn
+    with open(history_path(store, "s1"), "a", encoding="utf-8") as f:
+        f.write('{"role":"model","parts":[{"text":"uncommitted"}]}\n{"role":"us')
+
+    assert len(store.load("s1")["contents"]) == 3
+    assert os.path.getsize(history_path(store, "s1")) == committed_size
+    # A second restart before the next checkpoint still sees the full history
+    restored = store.load("s1")
+    assert len(restored["contents"]) == 3
+
+    restored["contents"].append(types.Content(role="model", parts=[types.Part(text="again")]))
+    store.checkpoint("s1", restored)
+    assert [c.parts[0].text for c in store.load("s1")["contents"][1:]] == [
+        "turn 1", "turn 2", "again"]
+
+
+def test_missing_blob_raises_and_keeps_history(store):
+    store.checkpoint("s1", make_session())
+    size = os.path.getsize(history_path(store, "s1"))
+    store.blobs.delete(store.blobs.put(PNG))
+
+    with pytest.raises(SessionCorrupt):
+        store.load("s1")
+    assert os.path.getsize(history_path(store, "s1")) == size
+
+
+def test_short_history_raises(store):
+    store.checkpoint("s1", make_session())
+    with open(history_path(store, "s1"), "rb") as f:
+        lines = f.readlines()
+    with open(history_path(store, "s1"), "wb") as f:
+        f.writelines(lines[:2])
+
+    with pytest.raises(SessionCorrupt, match="2 of 3"):
+        store.load("s1")
+
+
+def test_unknown_and_invalid_session_ids(store):
+    assert store.load("missing") is None
+    assert store.load("../etc") is None
+    assert store.read_meta("missing") is None
+
+
+def test_meta_is_rewritten_atomically(store):
+    store.checkpoint("s1", make_session())
+    with open(os.path.join(store.root, "s1", "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    assert meta["num_contents"] == 3
+    assert "contents" not in meta
+    assert not os.path.exists(os.path.join(store.root, "s1", "meta.json.tmp"))
+
+
+def test_iter_blob_ids_lists_screenshots_of_stored_sessions(store):
+    session = make_session()
+    session["screenshots"] = [store.blobs.put(PNG + b"meta")]
+    store.checkpoint("s1", session)
+
+    assert set(store.iter_blob_ids()) == {store.blobs.put(PNG), session["screenshots"][0]}